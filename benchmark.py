@@ -0,0 +1,160 @@
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from connections import close_connections
+from explain import run_plan_checks, print_plan_checks
+from queries import QUERIES, query_args, get_user_id, get_budget, load_budgets
+from stats import percentile
+
+# benchmark configuration
+DEFAULT_WARMUP = 3
+DEFAULT_ITERATIONS = 20
+DEFAULT_TOLERANCE = 0.20
+DEFAULT_METRIC = "p95"
+PERCENTILES = (50, 95, 99)
+
+# collapse raw nanosecond samples into millisecond stats
+def summarize(samples_ns):
+    values = sorted(s / 1e6 for s in samples_ns)
+    stats = {f"p{p}_ms": round(percentile(values, p), 4) for p in PERCENTILES}
+    stats["min_ms"] = round(values[0], 4)
+    stats["max_ms"] = round(values[-1], 4)
+    stats["mean_ms"] = round(sum(values) / len(values), 4)
+    stats["samples"] = len(values)
+    return stats
+
+# run a query warmup + iterations times with its printed output discarded
+# gc is collected between samples so a pause from one run does not land in the next
+def sample_query(func, args, warmup, iterations):
+    samples = []
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for _ in range(warmup):
+            func(*args)
+        for _ in range(iterations):
+            gc.collect()
+            start = time.perf_counter_ns()
+            func(*args)
+            samples.append(time.perf_counter_ns() - start)
+    return samples
+
+def run_benchmark(user_id, limit, warmup, iterations, metric, only=None):
+    results = {}
+    for name, func, backend, params in QUERIES:
+        if only and func.__name__ not in only:
+            continue
+        budget_ms = get_budget(func) * 1000
+        entry = {"name": name, "backend": backend, "budget_ms": budget_ms}
+        try:
+            samples = sample_query(func, query_args(params, user_id, limit), warmup, iterations)
+            entry.update(summarize(samples))
+            entry["status"] = "pass" if entry[f"{metric}_ms"] <= budget_ms else "fail"
+        except Exception as e:
+            entry["status"] = f"error: {e}"
+        results[func.__name__] = entry
+        print(f"benchmarked {func.__name__} ({entry['status']})", file=sys.stderr)
+    return results
+
+# flag every query whose metric grew by more than the tolerance over the baseline
+def compare_to_baseline(results, baseline, metric, tolerance):
+    regressions = []
+    key = f"{metric}_ms"
+    for qid, entry in results.items():
+        previous = baseline.get("queries", {}).get(qid, {})
+        if key not in entry or key not in previous or previous[key] <= 0:
+            continue
+        change = (entry[key] - previous[key]) / previous[key]
+        entry["baseline_ms"] = previous[key]
+        entry["change"] = round(change, 4)
+        if change > tolerance:
+            entry["regression"] = True
+            regressions.append(qid)
+    return regressions
+
+def print_report(results, metric):
+    print("\n" + "=" * 104)
+    print(f"{'query':<40} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | {'max (ms)':>9} | {'change':>7} | status")
+    print("=" * 104)
+    for entry in results.values():
+        if "p50_ms" not in entry:
+            print(f"{entry['name']:<40} | {'':>9} | {'':>9} | {'':>9} | {'':>9} | {'':>7} | {entry['status']}")
+            continue
+        change = f"{entry['change'] * 100:+.1f}%" if "change" in entry else ""
+        status = entry["status"] + (" (regression)" if entry.get("regression") else "")
+        print(f"{entry['name']:<40} | {entry['p50_ms']:>9.2f} | {entry['p95_ms']:>9.2f} | "
+              f"{entry['p99_ms']:>9.2f} | {entry['max_ms']:>9.2f} | {change:>7} | {status}")
+    print("=" * 104)
+    print(f"budgets are checked against {metric}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the evaluation queries.")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="untimed runs per query")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="timed runs per query")
+    parser.add_argument("--limit", type=int, default=50, help="result limit passed to the queries (0 for none)")
+    parser.add_argument("--user-id", type=int, help="pin the user id so runs are comparable")
+    parser.add_argument("--only", type=str, help="comma separated query functions, e.g. query_2,query_6")
+    parser.add_argument("--metric", choices=[f"p{p}" for p in PERCENTILES] + ["max"], default=DEFAULT_METRIC,
+                        help="statistic checked against budgets and the baseline")
+    parser.add_argument("--budgets", type=str, help="JSON file of per-query latency budgets (seconds)")
+    parser.add_argument("--output", type=str, help="write results to this JSON file")
+    parser.add_argument("--baseline", type=str, help="previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed fractional slowdown versus the baseline")
+    parser.add_argument("--explain", action="store_true",
+                        help="also fail the run if any query's plan falls back to a full scan")
+    args = parser.parse_args()
+
+    if args.budgets:
+        load_budgets(args.budgets)
+    only = set(args.only.split(",")) if args.only else None
+    limit = args.limit or None
+
+    try:
+        user_id = args.user_id if args.user_id is not None else get_user_id()
+        results = run_benchmark(user_id, limit, args.warmup, args.iterations, args.metric, only)
+        plan_checks = run_plan_checks(user_id, limit) if args.explain else []
+        regressions = []
+        if args.baseline:
+            with open(args.baseline, "r") as f:
+                regressions = compare_to_baseline(results, json.load(f), args.metric, args.tolerance)
+    finally:
+        close_connections()
+
+    print_report(results, args.metric)
+    if plan_checks:
+        print_plan_checks(plan_checks)
+    report = {
+        "created_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "user_id": user_id,
+        "limit": limit,
+        "warmup": args.warmup,
+        "iterations": args.iterations,
+        "metric": args.metric,
+        "tolerance": args.tolerance,
+        "queries": results,
+        "plans": {qid: {"ok": ok, "detail": detail} for qid, ok, detail in plan_checks},
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results saved to '{args.output}'")
+
+    failed = [qid for qid, entry in results.items() if entry["status"] != "pass"]
+    bad_plans = [qid for qid, ok, _ in plan_checks if not ok]
+    if failed or regressions or bad_plans:
+        if failed:
+            print(f"over budget or errored: {', '.join(failed)}")
+        if bad_plans:
+            print(f"not using an index: {', '.join(bad_plans)}")
+        if regressions:
+            print(f"regressed more than {args.tolerance * 100:.0f}% vs baseline: {', '.join(regressions)}")
+        sys.exit(1)
+    print("all queries within budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import json
+import time
+
+# redis cart layout and the batched commands shared by the session generator and query 7
+# the bulk helpers return how many round trips they made so callers can report them
+# carts are found through the carts:active index below, never by scanning the keyspace
+CART_PREFIX = "cart:"
+CART_PATTERN = CART_PREFIX + "*"
+CART_TTL = 3600
+
+# compact encoding: one "item:{product_id}" field per line holding "quantity:price_cents",
+# total_items / total_cents kept as integer counters with HINCRBY
+# (cents rather than HINCRBYFLOAT, which stores a 17 digit float string and drifts)
+ITEM_PREFIX = "item:"
+ENCODINGS = ("json", "compact")
+# fields a cart summary needs, item lines are never sent back for compact carts
+SUMMARY_FIELDS = ("user_id", "device", "total_amount", "total_cents", "total_items", "items")
+
+# batching defaults
+PIPELINE_SIZE = 500
+UNLINK_BATCH = 500
+PAGE_SIZE = 500
+
+def cart_key(session_id, prefix=CART_PREFIX):
+    return f"{prefix}{session_id}"
+
+def encode_cart(cart):
+    return {
+        "user_id": cart["user_id"],
+        "device": cart["device"],
+        "items": json.dumps(cart["items"]),
+        "total_amount": round(cart["total_amount"], 2),
+        "last_active": cart["last_active"],
+    }
+
+def to_cents(amount):
+    return int(round(amount * 100))
+
+def pack_item(quantity, price):
+    return f"{quantity}:{to_cents(price)}"
+
+def unpack_item(value):
+    quantity, cents = value.split(":")
+    return int(quantity), int(cents) / 100
+
+# the fields of a cart in the compact layout
+# repeated product ids merge into one line, the counters still see every addition
+def encode_compact_cart(cart):
+    lines = {}
+    for item in cart["items"]:
+        quantity, _ = lines.get(item["product_id"], (0, 0.0))
+        lines[item["product_id"]] = (quantity + item["quantity"], item["price"])
+    return {
+        "user_id": cart["user_id"],
+        "device": cart["device"],
+        "last_active": cart["last_active"],
+        **{f"{ITEM_PREFIX}{pid}": pack_item(qty, price) for pid, (qty, price) in lines.items()},
+        "total_items": sum(item["quantity"] for item in cart["items"]),
+        "total_cents": to_cents(cart["total_amount"]),
+    }
+
+# server-side aggregates, kept current by the scripts below on every cart write:
+#   carts:stats    hash of carts, items, cents and device:{name} counts over live carts
+#   carts:active   sorted set of cart keys scored by last_active
+#   carts:contrib  what each cart currently adds to carts:stats, "device:items:cents"
+# expired carts are taken back out by PRUNE_SCRIPT, which reads cart keys that are not
+# passed in KEYS, fine on the single redis node this project runs
+STATS_KEY = "carts:stats"
+ACTIVE_KEY = "carts:active"
+CONTRIB_KEY = "carts:contrib"
+AGGREGATE_KEYS = (STATS_KEY, ACTIVE_KEY, CONTRIB_KEY)
+PRUNE_BATCH = 1000
+
+# shared lua: swap a cart's previous contribution to carts:stats for a new one
+# (items/cents nil removes the cart from the aggregates)
+_CONTRIBUTION_LUA = """
+local function contribute(stats, contrib, key, device, items, cents)
+    local old = redis.call('HGET', contrib, key)
+    if old then
+        local d, i, c = string.match(old, '^(.*):(-?%d+):(-?%d+)$')
+        redis.call('HINCRBY', stats, 'carts', -1)
+        redis.call('HINCRBY', stats, 'device:' .. d, -1)
+        redis.call('HINCRBY', stats, 'items', -tonumber(i))
+        redis.call('HINCRBY', stats, 'cents', -tonumber(c))
+    end
+    if items then
+        redis.call('HINCRBY', stats, 'carts', 1)
+        redis.call('HINCRBY', stats, 'device:' .. device, 1)
+        redis.call('HINCRBY', stats, 'items', items)
+        redis.call('HINCRBY', stats, 'cents', cents)
+        redis.call('HSET', contrib, key, device .. ':' .. items .. ':' .. cents)
+    else
+        redis.call('HDEL', contrib, key)
+    end
+end
+"""
+
+# KEYS: cart, stats, active, contrib
+# ARGV: device, total items, total cents, last_active, ttl, then the cart's field/value pairs
+UPSERT_SCRIPT = _CONTRIBUTION_LUA + """
+local key, stats, active, contrib = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+redis.call('DEL', key)
+redis.call('HSET', key, unpack(ARGV, 6))
+redis.call('EXPIRE', key, ARGV[5])
+redis.call('ZADD', active, ARGV[4], key)
+contribute(stats, contrib, key, ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3]))
+return 1
+"""
+
+# KEYS: cart, stats, active, contrib
+# ARGV: item field, quantity, unit price cents, last_active, ttl, user_id, device
+# the line keeps the latest unit price, user_id/device only apply to a new cart
+ADD_ITEM_SCRIPT = _CONTRIBUTION_LUA + """
+local key, stats, active, contrib = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local quantity, cents = tonumber(ARGV[2]), tonumber(ARGV[3])
+local held = redis.call('HGET', key, ARGV[1])
+local total = quantity + (held and tonumber(string.match(held, '^(%d+)')) or 0)
+redis.call('HSETNX', key, 'user_id', ARGV[6])
+redis.call('HSETNX', key, 'device', ARGV[7])
+redis.call('HSET', key, ARGV[1], total .. ':' .. cents, 'last_active', ARGV[4])
+local items = redis.call('HINCRBY', key, 'total_items', quantity)
+local value = redis.call('HINCRBY', key, 'total_cents', quantity * cents)
+redis.call('EXPIRE', key, ARGV[5])
+redis.call('ZADD', active, ARGV[4], key)
+contribute(stats, contrib, key, redis.call('HGET', key, 'device'), items, value)
+return total
+"""
+
+# KEYS: stats, active, contrib
+# ARGV: cutoff (last_active at or below it has expired), max members to check
+PRUNE_SCRIPT = _CONTRIBUTION_LUA + """
+local stats, active, contrib = KEYS[1], KEYS[2], KEYS[3]
+local removed = 0
+for _, key in ipairs(redis.call('ZRANGEBYSCORE', active, '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])) do
+    if redis.call('EXISTS', key) == 0 then
+        contribute(stats, contrib, key, nil, nil, nil)
+        redis.call('ZREM', active, key)
+        removed = removed + 1
+    end
+end
+return removed
+"""
+
+# register_script keeps the sha and falls back to EVAL when the server has not seen it
+_scripts = {}
+
+def _script(r, source):
+    if source not in _scripts:
+        _scripts[source] = r.register_script(source)
+    return _scripts[source]
+
+# queue one cart write, through the upsert script (loaded as upsert_sha) when aggregates are kept
+def queue_upsert(pipe, key, cart, encoding, ttl=CART_TTL, upsert_sha=None):
+    fields = encode_compact_cart(cart) if encoding == "compact" else encode_cart(cart)
+    if upsert_sha is None:
+        pipe.delete(key)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, ttl)
+        return
+    args = [cart["device"], sum(item["quantity"] for item in cart["items"]), to_cents(cart["total_amount"]),
+            cart["last_active"], ttl]
+    for field, value in fields.items():
+        args += [field, value]
+    pipe.evalsha(upsert_sha, 1 + len(AGGREGATE_KEYS), key, *AGGREGATE_KEYS, *args)
+
+# add quantity of a product to a compact cart, the line, its counters and the aggregates change together
+def add_item(r, session_id, product_id, quantity, price, last_active, user_id=None, device=None, ttl=CART_TTL):
+    args = [f"{ITEM_PREFIX}{product_id}", quantity, to_cents(price), last_active, ttl, user_id or "", device or ""]
+    return _script(r, ADD_ITEM_SCRIPT)(keys=[cart_key(session_id), *AGGREGATE_KEYS], args=args)
+
+# take expired carts back out of the aggregates
+# returns (carts removed, round trips), one EVALSHA per batch
+def prune_expired(r, now, ttl=CART_TTL, batch=PRUNE_BATCH):
+    removed = 0
+    round_trips = 0
+    while True:
+        pruned = _script(r, PRUNE_SCRIPT)(keys=list(AGGREGATE_KEYS), args=[now - ttl, batch])
+        removed += pruned
+        round_trips += 1
+        if pruned < batch:
+            return removed, round_trips
+
+# dashboard aggregates over live carts, one HGETALL however many carts there are
+# plus the prune batches when now is given, the total is returned as round_trips
+def cart_stats(r, now=None, ttl=CART_TTL):
+    round_trips = 1
+    if now is not None:
+        round_trips += prune_expired(r, now, ttl)[1]
+    raw = {field: int(value) for field, value in r.hgetall(STATS_KEY).items()}
+    carts = raw.get("carts", 0)
+    return {
+        "round_trips": round_trips,
+        "carts": carts,
+        "items": raw.get("items", 0),
+        "value": raw.get("cents", 0) / 100,
+        "avg_items": round(raw.get("items", 0) / carts, 2) if carts else 0.0,
+        "devices": {field[len("device:"):]: count for field, count in sorted(raw.items())
+                    if field.startswith("device:") and count},
+    }
+
+# item lines of a cart in either encoding, as (product_id, quantity, price)
+def cart_items(cart):
+    if "items" in cart:
+        return [(item["product_id"], item["quantity"], item["price"]) for item in json.loads(cart["items"])]
+    return [(int(field[len(ITEM_PREFIX):]),) + unpack_item(value)
+            for field, value in cart.items() if field.startswith(ITEM_PREFIX)]
+
+# compact carts carry the count, json carts have to be decoded
+def cart_item_count(cart):
+    if cart.get("total_items") is not None:
+        return int(cart["total_items"])
+    return sum(item["quantity"] for item in json.loads(cart.get("items") or "[]"))
+
+def cart_total(cart):
+    if cart.get("total_cents") is not None:
+        return int(cart["total_cents"]) / 100
+    return round(float(cart.get("total_amount") or 0), 2)
+
+# upsert many carts, one MULTI-less pipeline per chunk
+# aggregates=False writes bare hashes that the server-side aggregates never see
+def write_carts(r, carts, chunk_size=PIPELINE_SIZE, ttl=CART_TTL, encoding="json", prefix=CART_PREFIX,
+                aggregates=True):
+    round_trips = 0
+    upsert_sha = None
+    if aggregates:
+        upsert_sha = r.script_load(UPSERT_SCRIPT)
+        round_trips += 1
+    pipe = r.pipeline(transaction=False)
+    pending = 0
+    for session_id, cart in carts:
+        key = cart_key(session_id, prefix)
+        queue_upsert(pipe, key, cart, encoding, ttl, upsert_sha)
+        pending += 1
+        if pending == chunk_size:
+            pipe.execute()
+            round_trips += 1
+            pending = 0
+    if pending:
+        pipe.execute()
+        round_trips += 1
+    return round_trips
+
+# last_active at or below the cutoff means the cart's ttl has run out
+def active_cutoff(now=None, ttl=CART_TTL):
+    return (int(time.time()) if now is None else now) - ttl
+
+# live carts in the index, one ZCOUNT
+def count_active(r, now=None, ttl=CART_TTL):
+    return r.zcount(ACTIVE_KEY, f"({active_cutoff(now, ttl)}", "+inf")
+
+# one page of live cart keys, most recently active first unless newest_first is False
+# count None runs to the end of the index
+def list_active(r, offset=0, count=None, now=None, ttl=CART_TTL, newest_first=True):
+    cutoff = f"({active_cutoff(now, ttl)}"
+    num = -1 if count is None else count
+    if newest_first:
+        return r.zrevrangebyscore(ACTIVE_KEY, "+inf", cutoff, start=offset, num=num)
+    return r.zrangebyscore(ACTIVE_KEY, cutoff, "+inf", start=offset, num=num)
+
+def most_recent(r, n, now=None, ttl=CART_TTL):
+    return list_active(r, 0, n, now, ttl)
+
+# every live cart key, page_size at a time
+def iter_active(r, page_size=PAGE_SIZE, now=None, ttl=CART_TTL):
+    offset = 0
+    while True:
+        keys = list_active(r, offset, page_size, now, ttl)
+        yield keys
+        if len(keys) < page_size:
+            return
+        offset += page_size
+
+# drop every indexed cart and the aggregates, UNLINK frees the memory off the main thread
+# walks the index by rank, expired members included, so nothing it tracked is left behind
+# returns (cart keys removed, round trips)
+def clear_carts(r, batch_size=UNLINK_BATCH):
+    removed = 0
+    round_trips = 0
+    start = 0
+    while True:
+        keys = r.zrange(ACTIVE_KEY, start, start + batch_size - 1)
+        round_trips += 1
+        if keys:
+            removed += r.unlink(*keys)
+            round_trips += 1
+        if len(keys) < batch_size:
+            break
+        start += batch_size
+    r.unlink(*AGGREGATE_KEYS)
+    return removed, round_trips + 1
+
+# count the live carts and read the `limit` most recently active of them (all when limit is None)
+# from the index, the hashes go out in one pipeline: HGETALL by default or HMGET of just
+# `fields`, missing fields are left out of the returned dicts
+# returns (total carts, [(key, cart)], round trips)
+def fetch_carts(r, limit=None, fields=None, now=None, ttl=CART_TTL):
+    now = int(time.time()) if now is None else now
+    pipe = r.pipeline(transaction=False)
+    pipe.zcount(ACTIVE_KEY, f"({active_cutoff(now, ttl)}", "+inf")
+    pipe.zrevrangebyscore(ACTIVE_KEY, "+inf", f"({active_cutoff(now, ttl)}", start=0, num=limit or -1)
+    total, keys = pipe.execute()
+    if not keys:
+        return total, [], 1
+
+    pipe = r.pipeline(transaction=False)
+    for key in keys:
+        if fields:
+            pipe.hmget(key, fields)
+        else:
+            pipe.hgetall(key)
+    results = pipe.execute()
+    if fields:
+        results = [{f: v for f, v in zip(fields, values) if v is not None} for values in results]
+    # a cart can expire between the two round trips, it comes back empty
+    carts = [(key, cart) for key, cart in zip(keys, results) if cart]
+    return total, carts, 2
+
+# bytes redis reports for each key, SAMPLES 0 counts every field of the hash
+def memory_usage(r, keys):
+    pipe = r.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=0)
+    return [usage or 0 for usage in pipe.execute()]
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import sys
+
+from benchmark import DEFAULT_WARMUP, DEFAULT_ITERATIONS, run_benchmark, sample_query, summarize
+from connections import get_mongo_db, close_connections
+from queries import get_user_id, event_layout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "database", "mongo"))
+from rollups import EVENT_FIELDS, ROLLUPS
+
+# the queries that read user_events directly, queries 5 and 11 read the rollup collections
+# so the layout shows up in the rollup pipelines instead
+COMPARED_QUERIES = ("query_2", "query_6")
+# each pipeline scans every matching event, so fewer runs than the queries
+DEFAULT_PIPELINE_ITERATIONS = 3
+
+def storage_stats(db):
+    stats = db.command("collStats", "user_events")
+    return {
+        "documents": db.user_events.count_documents({}),
+        "data_mb": round(stats.get("size", 0) / 2**20, 2),
+        "storage_mb": round(stats.get("storageSize", 0) / 2**20, 2),
+        "index_mb": round(stats.get("totalIndexSize", 0) / 2**20, 2),
+        "indexes": stats.get("nindexes", 0),
+    }
+
+# the aggregations rollups.py --backfill / --check run over user_events, without the $merge
+def run_pipelines(db, iterations):
+    fields = EVENT_FIELDS[event_layout()]
+    results = {}
+    for collection, _, pipeline in ROLLUPS:
+        stages = pipeline(fields)
+        try:
+            samples = sample_query(lambda: list(db.user_events.aggregate(stages, allowDiskUse=True)), (),
+                                   0, iterations)
+            results[collection] = summarize(samples)
+        except Exception as e:
+            results[collection] = {"status": f"error: {e}"}
+    return results
+
+# storage and latency of whichever layout user_events currently has
+def snapshot(user_id, limit, warmup, iterations, pipeline_iterations):
+    db = get_mongo_db()
+    return {
+        "layout": event_layout(),
+        "user_id": user_id,
+        "limit": limit,
+        "storage": storage_stats(db),
+        "queries": run_benchmark(user_id, limit, warmup, iterations, "p95", set(COMPARED_QUERIES)),
+        "pipelines": run_pipelines(db, pipeline_iterations),
+    }
+
+def print_latency_rows(rows_a, rows_b, names):
+    for name in names:
+        qa, qb = rows_a.get(name, {}), rows_b.get(name, {})
+        if "p50_ms" not in qa or "p50_ms" not in qb:
+            print(f"{name:<20} | {qa.get('status', 'missing'):>12} | {qb.get('status', 'missing'):>12} |")
+            continue
+        cell_a = f"{qa['p50_ms']:.1f} / {qa['p95_ms']:.1f}"
+        cell_b = f"{qb['p50_ms']:.1f} / {qb['p95_ms']:.1f}"
+        ratio = f"{qb['p95_ms'] / qa['p95_ms']:.2f}x" if qa["p95_ms"] else ""
+        print(f"{name:<20} | {cell_a:>12} | {cell_b:>12} | {ratio:>7}")
+
+def print_comparison(a, b):
+    la, lb = a["layout"], b["layout"]
+    print("\n" + "=" * 62)
+    print(f"{'storage':<20} | {la:>12} | {lb:>12} | {'ratio':>7}")
+    print("=" * 62)
+    for key, value in a["storage"].items():
+        other = b["storage"].get(key, 0)
+        ratio = f"{other / value:.2f}x" if value else ""
+        print(f"{key:<20} | {value:>12} | {other:>12} | {ratio:>7}")
+    print("\n" + "=" * 62)
+    print(f"{'p50 / p95 (ms)':<20} | {la:>12} | {lb:>12} | {'ratio':>7}")
+    print("=" * 62)
+    print_latency_rows(a["queries"], b["queries"], COMPARED_QUERIES)
+    print("-" * 62)
+    print_latency_rows(a.get("pipelines", {}), b.get("pipelines", {}), [collection for collection, _, _ in ROLLUPS])
+    print("=" * 62)
+    if a["user_id"] != b["user_id"]:
+        print(f"note: snapshots used different users ({a['user_id']} vs {b['user_id']}), pass --user-id to pin one")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Snapshot user_events storage and event query latency, or compare two snapshots.")
+    parser.add_argument("--output", type=str, help="write a snapshot of the current layout to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("A", "B"), help="compare two snapshot files")
+    parser.add_argument("--user-id", type=int, help="pin the user id so snapshots are comparable")
+    parser.add_argument("--limit", type=int, default=50, help="result limit passed to the queries (0 for none)")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="untimed runs per query")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="timed runs per query")
+    parser.add_argument("--pipeline-iterations", type=int, default=DEFAULT_PIPELINE_ITERATIONS,
+                        help="timed runs per rollup pipeline")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], "r") as f:
+            a = json.load(f)
+        with open(args.compare[1], "r") as f:
+            b = json.load(f)
+        print_comparison(a, b)
+        return
+
+    try:
+        user_id = args.user_id if args.user_id is not None else get_user_id()
+        result = snapshot(user_id, args.limit or None, args.warmup, args.iterations, args.pipeline_iterations)
+    finally:
+        close_connections()
+
+    print(f"\nuser_events layout: {result['layout']}")
+    for key, value in result["storage"].items():
+        print(f"{key:<12} {value}")
+    for qid, entry in {**result["queries"], **result["pipelines"]}.items():
+        if "p50_ms" in entry:
+            print(f"{qid:<20} p50 {entry['p50_ms']:.2f} ms, p95 {entry['p95_ms']:.2f} ms")
+        else:
+            print(f"{qid:<20} {entry['status']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"snapshot saved to '{args.output}'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import atexit
+import threading
+from contextlib import contextmanager
+
+import pymongo
+import redis
+from neo4j import GraphDatabase
+from psycopg2 import pool as pg_pool
+
+# postgres configuration
+PG_HOST = "localhost"
+PG_DB = "ecommerce_db"
+PG_USER = "admin"
+PG_PASS = "password"
+PG_POOL_MIN = 1
+PG_POOL_MAX = 20
+
+# mongo configuration
+MONGO_URI = "mongodb://localhost:27017/"
+MONGO_DB_NAME = "ecommerce_db"
+MONGO_POOL_MAX = 50
+
+# neo4j configuration
+NEO4J_URI = "bolt://localhost:7687"
+NEO4J_AUTH = ("neo4j", "password")
+NEO4J_POOL_MAX = 50
+
+# redis configuration
+REDIS_HOST = "localhost"
+REDIS_PORT = 6379
+REDIS_POOL_MAX = 50
+
+
+# process-wide holder for one client per backend
+# each backend is opened lazily on first use so a run that only touches mongo
+# never pays for a postgres handshake, and close() tears everything down
+class ConnectionManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pg_pool = None
+        self._pg_slots = None
+        self._mongo_client = None
+        self._neo4j_driver = None
+        self._redis_pool = None
+
+    # postgres: bounded, thread-safe pool
+    # ThreadedConnectionPool raises once maxconn is handed out, so a semaphore
+    # makes callers wait for a free connection instead of failing
+    def _get_pg_pool(self):
+        if self._pg_pool is None:
+            with self._lock:
+                if self._pg_pool is None:
+                    self._pg_slots = threading.BoundedSemaphore(PG_POOL_MAX)
+                    self._pg_pool = pg_pool.ThreadedConnectionPool(
+                        PG_POOL_MIN, PG_POOL_MAX, host=PG_HOST, database=PG_DB,
+                        user=PG_USER, password=PG_PASS)
+        return self._pg_pool
+
+    @contextmanager
+    def pg_conn(self):
+        pool = self._get_pg_pool()
+        self._pg_slots.acquire()
+        conn = None
+        broken = False
+        try:
+            conn = pool.getconn()
+            yield conn
+            # queries are read-only, end the implicit transaction so the
+            # connection does not sit "idle in transaction" in the pool
+            conn.rollback()
+        except Exception:
+            broken = conn is not None and conn.closed != 0
+            if conn is not None and not broken:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                pool.putconn(conn, close=broken)
+            self._pg_slots.release()
+
+    # mongo: MongoClient is itself a thread-safe pool
+    def mongo_client(self):
+        if self._mongo_client is None:
+            with self._lock:
+                if self._mongo_client is None:
+                    self._mongo_client = pymongo.MongoClient(MONGO_URI, maxPoolSize=MONGO_POOL_MAX)
+        return self._mongo_client
+
+    def mongo_db(self):
+        return self.mongo_client()[MONGO_DB_NAME]
+
+    # neo4j: the driver owns its own connection pool
+    def neo4j_driver(self):
+        if self._neo4j_driver is None:
+            with self._lock:
+                if self._neo4j_driver is None:
+                    self._neo4j_driver = GraphDatabase.driver(
+                        NEO4J_URI, auth=NEO4J_AUTH, max_connection_pool_size=NEO4J_POOL_MAX)
+        return self._neo4j_driver
+
+    # redis: clients are cheap wrappers, the shared ConnectionPool holds the sockets
+    def redis_client(self):
+        if self._redis_pool is None:
+            with self._lock:
+                if self._redis_pool is None:
+                    self._redis_pool = redis.BlockingConnectionPool(
+                        host=REDIS_HOST, port=REDIS_PORT, decode_responses=True,
+                        max_connections=REDIS_POOL_MAX)
+        return redis.Redis(connection_pool=self._redis_pool)
+
+    def close(self):
+        with self._lock:
+            if self._pg_pool is not None:
+                self._pg_pool.closeall()
+                self._pg_pool = None
+            if self._mongo_client is not None:
+                self._mongo_client.close()
+                self._mongo_client = None
+            if self._neo4j_driver is not None:
+                self._neo4j_driver.close()
+                self._neo4j_driver = None
+            if self._redis_pool is not None:
+                self._redis_pool.disconnect()
+                self._redis_pool = None
+
+
+_manager = ConnectionManager()
+
+
+def get_manager():
+    return _manager
+
+
+# module-level shortcuts used by the query functions
+def pg_conn():
+    return _manager.pg_conn()
+
+
+def get_mongo_db():
+    return _manager.mongo_db()
+
+
+def get_neo4j_driver():
+    return _manager.neo4j_driver()
+
+
+def get_redis_client():
+    return _manager.redis_client()
+
+
+def close_connections():
+    _manager.close()
+
+
+# make sure sockets are released even if a caller forgets
+atexit.register(close_connections)
@@ -1,13 +1,27 @@
 # base generated from Gemini: https://gemini.google.com/share/000057595518
+import argparse
+import gzip
+import io
 import json
+import math
 import random
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # configuration
 NUM_LOGS = 500000
 NUM_PRODUCTS = 10000
-OUTPUT_FILE = "user_behavior_logs.json"
+OUTPUT_BASE = "user_behavior_logs"
+EXTENSIONS = {"json": ".json", "ndjson": ".ndjson"}
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+NUMPY_BATCH_SIZE = 100000
 
 # shared data logic
 CATEGORY_MAP = {
@@ -46,9 +60,13 @@ DEVICES = ["mobile", "desktop", "tablet"]
 FILTERS = ["price_desc", "price_asc", "newest", "rating_4_plus", "none"]
 PAYMENT_METHODS = ["credit_card", "paypal", "apple_pay"]
 
+# timestamps fall in the 30 days before this anchor, pinned once per run
+# so every worker (and every rerun with --end-time) sees the same window
+END_TIME = None
+
 # helpers
 def get_random_timestamp():
-    end = datetime.utcnow()
+    end = END_TIME or datetime.utcnow()
     start = end - timedelta(days=30)
     random_date = start + (end - start) * random.random()
     return random_date.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -150,27 +168,404 @@ EVENT_TYPES = {
 # weights
 EVENT_WEIGHTS = [0.45, 0.15, 0.10, 0.05, 0.10, 0.10, 0.05]
 
+# uuids come from the module rng rather than os.urandom so seeded runs repeat
+def random_hex():
+    return uuid.UUID(int=random.getrandbits(128), version=4).hex
+
 def generate_log():
     event_type = random.choices(list(EVENT_TYPES.keys()), weights=EVENT_WEIGHTS, k=1)[0]
     log_entry = {
-        "_id": f"evt_{uuid.uuid4().hex}",
+        "_id": f"evt_{random_hex()}",
         "user_id": random.randint(1, 1000), 
-        "session_id": f"sess_{uuid.uuid4().hex[:8]}",
+        "session_id": f"sess_{random_hex()[:8]}",
         "timestamp": get_random_timestamp(),
         "event_type": event_type,
         "details": EVENT_TYPES[event_type]()
     }
     return log_entry
 
-print(f"generating {NUM_LOGS} aligned user behavior logs.")
-
-# writing to file
-with open(OUTPUT_FILE, "w") as f:
-    f.write("[")
-    for i in range(NUM_LOGS):
-        log = generate_log()
-        json.dump(log, f)
-        if i < NUM_LOGS - 1:
-            f.write(",\n")
-    f.write("]")
-print(f"logs saved to '{OUTPUT_FILE}'")
\ No newline at end of file
+# numpy batch engine
+# draws each field for a whole batch as one column, matching the distributions
+# of generate_log, and turns rows into json text only when serialising
+CATEGORIES = list(CATEGORY_MAP)
+SUBCATEGORIES = [list(CATEGORY_MAP[cat]) for cat in CATEGORIES]
+SOURCE_PAGES = ["search_results", "category_page", "recommendations"]
+
+def make_numpy_rng(seed=None, worker=0):
+    if np is None:
+        raise SystemExit("error: the numpy engine needs the 'numpy' package (pip install numpy)")
+    return np.random.default_rng(None if seed is None else [seed, worker])
+
+# cat uniform, then subcat uniform within it, then price uniform in its range
+def draw_product_context(np_rng, n):
+    sub_counts = np.array([len(subs) for subs in SUBCATEGORIES])
+    width = sub_counts.max()
+    lows = np.zeros((len(CATEGORIES), width))
+    highs = np.zeros((len(CATEGORIES), width))
+    for c, cat in enumerate(CATEGORIES):
+        for s_idx, sub in enumerate(SUBCATEGORIES[c]):
+            lows[c, s_idx], highs[c, s_idx] = CATEGORY_MAP[cat][sub]
+    cat_idx = np_rng.integers(0, len(CATEGORIES), n)
+    sub_idx = (np_rng.random(n) * sub_counts[cat_idx]).astype(np.int64)
+    low, high = lows[cat_idx, sub_idx], highs[cat_idx, sub_idx]
+    price = np.round(low + (high - low) * np_rng.random(n), 2)
+    return cat_idx, sub_idx, price
+
+# sum of 1..max_items independently drawn product prices, like the cart helpers
+def draw_basket(np_rng, n, max_items):
+    items = np_rng.integers(1, max_items + 1, n)
+    _, _, prices = draw_product_context(np_rng, n * max_items)
+    prices = prices.reshape(n, max_items)
+    prices[np.arange(max_items) >= items[:, None]] = 0.0
+    return items, np.round(prices.sum(axis=1), 2)
+
+def generate_batch_numpy(np_rng, count):
+    weights = np.array(EVENT_WEIGHTS) / sum(EVENT_WEIGHTS)
+    raw_ids = np.frombuffer(np_rng.bytes(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw_ids[:, 6] = (raw_ids[:, 6] & 0x0F) | 0x40
+    raw_ids[:, 8] = (raw_ids[:, 8] & 0x3F) | 0x80
+    end = np.datetime64(END_TIME or datetime.utcnow(), "us")
+    span = np.timedelta64(30 * 24 * 3600 * 10**6, "us")
+    offsets = (np_rng.random(count) * span.astype(np.int64)).astype("timedelta64[us]")
+    batch = {
+        "count": count,
+        "event_type": np_rng.choice(len(EVENT_TYPES), size=count, p=weights),
+        "id_hex": raw_ids.tobytes().hex(),
+        "session_hex": np_rng.bytes(4 * count).hex(),
+        "user_id": np_rng.integers(1, 1001, count),
+        "timestamp": np.datetime_as_string((end - span + offsets).astype("datetime64[s]"), unit="s"),
+    }
+
+    # per event type detail columns, drawn only for the rows of that type
+    event_names = list(EVENT_TYPES)
+    details = {}
+    for t, name in enumerate(event_names):
+        rows = np.flatnonzero(batch["event_type"] == t)
+        n = len(rows)
+        cols = {"rows": rows}
+        if name == "view_product":
+            cols["product_id"] = np_rng.integers(1, NUM_PRODUCTS + 1, n)
+            cols["cat"], cols["sub"], cols["price"] = draw_product_context(np_rng, n)
+            cols["time_spent"] = np_rng.integers(5, 301, n)
+            cols["device"] = np_rng.integers(0, len(DEVICES), n)
+        elif name == "search":
+            cols["query"] = np_rng.integers(0, len(SEARCH_TERMS), n)
+            # random.sample(FILTERS, k) for k in 0..2: an ordered pair of distinct filters
+            cols["num_filters"] = np_rng.integers(0, 3, n)
+            first = np_rng.integers(0, len(FILTERS), n)
+            second = np_rng.integers(0, len(FILTERS) - 1, n)
+            cols["filter_a"], cols["filter_b"] = first, second + (second >= first)
+            cols["results_count"] = np_rng.integers(0, 151, n)
+        elif name == "add_to_cart":
+            cols["product_id"] = np_rng.integers(1, NUM_PRODUCTS + 1, n)
+            cols["cat"], _, cols["price"] = draw_product_context(np_rng, n)
+            cols["quantity"] = np_rng.integers(1, 4, n)
+        elif name == "remove_from_cart":
+            cols["product_id"] = np_rng.integers(1, NUM_PRODUCTS + 1, n)
+        elif name == "check_cart_status":
+            cols["items"], cols["value"] = draw_basket(np_rng, n, 5)
+        elif name == "click_product":
+            cols["product_id"] = np_rng.integers(1, NUM_PRODUCTS + 1, n)
+            cols["position"] = np_rng.integers(1, 21, n)
+            cols["source"] = np_rng.integers(0, len(SOURCE_PAGES), n)
+        elif name == "purchase_completed":
+            cols["order_id"] = np_rng.integers(10000, 100000, n)
+            cols["items"], cols["value"] = draw_basket(np_rng, n, 6)
+            cols["payment"] = np_rng.integers(0, len(PAYMENT_METHODS), n)
+        details[name] = cols
+    batch["details"] = details
+    return batch
+
+# json text for each row, formatted exactly like json.dumps(generate_log())
+# every row is a single f-string: envelope and details are gathered per event type, and
+# whatever can be is rendered per column or looked up instead of being formatted per row
+# prices are whole cents, so repr(price) is the whole part plus a fragment from CENT_TEXT
+CENT_TEXT = ["." + (f"{c:02d}".rstrip("0") or "0") for c in range(100)]
+
+def money_columns(values):
+    whole, cents = np.divmod(np.rint(values * 100).astype(np.int64), 100)
+    return whole.tolist(), [CENT_TEXT[c] for c in cents.tolist()]
+
+def serialize_batch(batch):
+    q = json.dumps
+    width = max(len(subs) for subs in SUBCATEGORIES)
+    # "category": ..., "subcategory": ... rendered once per (cat, sub), indexed by cat * width + sub
+    cat_subs = [f'"category": {q(cat)}, "subcategory": {q(subs[i]) if i < len(subs) else "null"}'
+                for cat, subs in zip(CATEGORIES, SUBCATEGORIES) for i in range(width)]
+    cats = [q(c) for c in CATEGORIES]
+    devices, terms = [q(d) for d in DEVICES], [q(t) for t in SEARCH_TERMS]
+    filters, sources, payments = [q(f) for f in FILTERS], [q(p) for p in SOURCE_PAGES], [q(p) for p in PAYMENT_METHODS]
+    ids = np.frombuffer(batch["id_hex"].encode(), dtype="S32")
+    sessions = np.frombuffer(batch["session_hex"].encode(), dtype="S8")
+
+    lines = [None] * batch["count"]
+    for name, cols in batch["details"].items():
+        rows = cols["rows"]
+        c = {key: value.tolist() for key, value in cols.items() if key not in ("price", "value")}
+        head = zip(ids[rows].astype("U32").tolist(), batch["user_id"][rows].tolist(),
+                   sessions[rows].astype("U8").tolist(), batch["timestamp"][rows].tolist())
+        if name == "view_product":
+            cat_sub = (cols["cat"] * width + cols["sub"]).tolist()
+            whole, cents = money_columns(cols["price"])
+            # "time_spent_seconds": ..., "device": ...}} rendered once per (seconds, device)
+            tails = [f', "time_spent_seconds": {ts}, "device": {device}}}}}' for ts in range(301) for device in devices]
+            tail = (cols["time_spent"] * len(DEVICES) + cols["device"]).tolist()
+            text = [f'{{"_id": "evt_{i}", "user_id": {u}, "session_id": "sess_{s}", "timestamp": "{t}Z", '
+                    f'"event_type": "view_product", "details": {{"product_id": "prod_{p}", {cat_subs[cs]}, '
+                    f'"price_at_view": {w}{f}{tails[tl]}'
+                    for (i, u, s, t), p, cs, w, f, tl in zip(head, c["product_id"], cat_sub, whole, cents, tail)]
+        elif name == "search":
+            # rendered filter list indexed by [count][first][second]
+            applied = [[["[]"] * len(FILTERS) for _ in FILTERS],
+                       [[f"[{filters[a]}]"] * len(FILTERS) for a in range(len(FILTERS))],
+                       [[f"[{filters[a]}, {filters[b]}]" for b in range(len(FILTERS))] for a in range(len(FILTERS))]]
+            text = [f'{{"_id": "evt_{i}", "user_id": {u}, "session_id": "sess_{s}", "timestamp": "{t}Z", '
+                    f'"event_type": "search", "details": {{"query": {terms[qi]}, '
+                    f'"filters_applied": {applied[k][fa][fb]}, "results_count": {rc}}}}}'
+                    for (i, u, s, t), qi, k, fa, fb, rc in zip(head, c["query"], c["num_filters"], c["filter_a"],
+                                                               c["filter_b"], c["results_count"])]
+        elif name == "add_to_cart":
+            whole, cents = money_columns(cols["price"])
+            text = [f'{{"_id": "evt_{i}", "user_id": {u}, "session_id": "sess_{s}", "timestamp": "{t}Z", '
+                    f'"event_type": "add_to_cart", "details": {{"product_id": "prod_{p}", "category": {cats[ci]}, '
+                    f'"quantity": {qty}, "price_unit": {w}{f}, "currency": "USD"}}}}'
+                    for (i, u, s, t), p, ci, qty, w, f in zip(head, c["product_id"], c["cat"], c["quantity"],
+                                                              whole, cents)]
+        elif name == "remove_from_cart":
+            text = [f'{{"_id": "evt_{i}", "user_id": {u}, "session_id": "sess_{s}", "timestamp": "{t}Z", '
+                    f'"event_type": "remove_from_cart", "details": {{"product_id": "prod_{p}", "quantity_removed": 1}}}}'
+                    for (i, u, s, t), p in zip(head, c["product_id"])]
+        elif name == "check_cart_status":
+            whole, cents = money_columns(cols["value"])
+            text = [f'{{"_id": "evt_{i}", "user_id": {u}, "session_id": "sess_{s}", "timestamp": "{t}Z", '
+                    f'"event_type": "check_cart_status", "details": {{"total_items": {k}, "cart_value": {w}{f}, '
+                    f'"currency": "USD"}}}}'
+                    for (i, u, s, t), k, w, f in zip(head, c["items"], whole, cents)]
+        elif name == "click_product":
+            text = [f'{{"_id": "evt_{i}", "user_id": {u}, "session_id": "sess_{s}", "timestamp": "{t}Z", '
+                    f'"event_type": "click_product", "details": {{"product_id": "prod_{p}", "position_in_list": {pos}, '
+                    f'"source_page": {sources[src]}}}}}'
+                    for (i, u, s, t), p, pos, src in zip(head, c["product_id"], c["position"], c["source"])]
+        else:
+            whole, cents = money_columns(cols["value"])
+            text = [f'{{"_id": "evt_{i}", "user_id": {u}, "session_id": "sess_{s}", "timestamp": "{t}Z", '
+                    f'"event_type": "purchase_completed", "details": {{"order_id": "ord_{o}", '
+                    f'"total_amount": {w}{f}, "payment_method": {payments[pm]}, "items_count": {k}}}}}'
+                    for (i, u, s, t), o, w, f, pm, k in zip(head, c["order_id"], whole, cents, c["payment"], c["items"])]
+        for row, line in zip(c["rows"], text):
+            lines[row] = line
+    return lines
+
+# serialised events from either engine, each worker/seed pair is its own stream
+def generate_lines(count, engine="python", seed=None, worker=0):
+    if engine == "numpy":
+        np_rng = make_numpy_rng(seed, worker)
+        for start in range(0, count, NUMPY_BATCH_SIZE):
+            yield from serialize_batch(generate_batch_numpy(np_rng, min(NUMPY_BATCH_SIZE, count - start)))
+        return
+    if seed is not None:
+        random.seed(f"{seed}:{worker}")
+    for _ in range(count):
+        yield json.dumps(generate_log())
+
+# output helpers
+def open_output(path, compress):
+    if compress == "gzip":
+        return gzip.open(path, "wt")
+    if compress == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("error: zstd output needs the 'zstandard' package (pip install zstandard)")
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw, closefd=True), encoding="utf-8")
+    return open(path, "w")
+
+def output_path(fmt, compress, shard=None, base=OUTPUT_BASE):
+    name = base if shard is None else f"{base}-{shard:05d}"
+    return name + EXTENSIONS[fmt] + COMPRESSION_SUFFIXES[compress]
+
+# write serialised logs to one file, a json array or one document per line
+def write_file(path, lines, fmt, compress):
+    count = 0
+    with open_output(path, compress) as f:
+        if fmt == "json":
+            f.write("[")
+        for line in lines:
+            if fmt == "json" and count:
+                f.write(",\n")
+            f.write(line)
+            if fmt == "ndjson":
+                f.write("\n")
+            count += 1
+        if fmt == "json":
+            f.write("]")
+    return count
+
+# write logs to a single file, or to shard files of shard_size events each
+def write_logs(logs, fmt="json", compress="none", shard_size=0, base=OUTPUT_BASE):
+    if not shard_size:
+        path = output_path(fmt, compress, base=base)
+        write_file(path, logs, fmt, compress)
+        return [path]
+
+    paths = []
+    logs = iter(logs)
+    while True:
+        first = next(logs, None)
+        if first is None:
+            return paths
+        path = output_path(fmt, compress, len(paths), base)
+        write_file(path, _take(first, logs, shard_size), fmt, compress)
+        paths.append(path)
+
+def _take(first, logs, count):
+    yield first
+    for _ in range(count - 1):
+        log = next(logs, None)
+        if log is None:
+            return
+        yield log
+
+# distribution check between the two engines
+# chi-square homogeneity for categorical fields, two-sample kolmogorov-smirnov
+# for numeric ones; no scipy, the p-values use the standard approximations
+SIGNIFICANCE = 0.001
+
+def counts(values):
+    result = {}
+    for value in values:
+        result[value] = result.get(value, 0) + 1
+    return result
+
+def chi_square_test(a, b):
+    keys = sorted(set(a) | set(b), key=str)
+    table = [[x.get(k, 0) for k in keys] for x in (counts(a), counts(b))]
+    total = sum(map(sum, table))
+    rows = [sum(r) for r in table]
+    cols = [table[0][j] + table[1][j] for j in range(len(keys))]
+    stat = sum((table[i][j] - rows[i] * cols[j] / total) ** 2 / (rows[i] * cols[j] / total)
+               for i in range(2) for j in range(len(keys)))
+    df = max(len(keys) - 1, 1)
+    # wilson-hilferty normal approximation of the chi-square tail
+    z = ((stat / df) ** (1 / 3) - (1 - 2 / (9 * df))) / math.sqrt(2 / (9 * df))
+    return stat, 0.5 * math.erfc(z / math.sqrt(2))
+
+def ks_test(a, b):
+    a, b = np.sort(np.asarray(a, dtype=float)), np.sort(np.asarray(b, dtype=float))
+    grid = np.concatenate([a, b])
+    stat = np.max(np.abs(np.searchsorted(a, grid, side="right") / len(a)
+                         - np.searchsorted(b, grid, side="right") / len(b)))
+    n = len(a) * len(b) / (len(a) + len(b))
+    lam = (math.sqrt(n) + 0.12 + 0.11 / math.sqrt(n)) * stat
+    p = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return float(stat), min(max(p, 0.0), 1.0)
+
+def check_distribution(sample_size, seed=None):
+    lines, rates = {}, {}
+    # both engines are timed before anything is parsed: the parsed python sample is 100k+ live
+    # dicts, and every full gc pass during the numpy run would have to walk them
+    for engine in ("python", "numpy"):
+        start = time.perf_counter()
+        lines[engine] = list(generate_lines(sample_size, engine, seed))
+        rates[engine] = sample_size / (time.perf_counter() - start)
+    samples = {engine: [json.loads(line) for line in text] for engine, text in lines.items()}
+
+    def column(docs, field, event_type=None):
+        return [field(d) for d in docs if event_type is None or d["event_type"] == event_type]
+
+    epoch = lambda d: datetime.strptime(d["timestamp"], "%Y-%m-%dT%H:%M:%SZ").timestamp()
+    product = lambda d: int(d["details"]["product_id"][5:])
+    checks = [
+        ("event_type", chi_square_test, lambda d: d["event_type"], None),
+        ("view category", chi_square_test, lambda d: d["details"]["category"], "view_product"),
+        ("view subcategory", chi_square_test, lambda d: d["details"]["subcategory"], "view_product"),
+        ("view device", chi_square_test, lambda d: d["details"]["device"], "view_product"),
+        ("search query", chi_square_test, lambda d: d["details"]["query"], "search"),
+        ("search filters", chi_square_test, lambda d: tuple(d["details"]["filters_applied"]), "search"),
+        ("cart category", chi_square_test, lambda d: d["details"]["category"], "add_to_cart"),
+        ("click source", chi_square_test, lambda d: d["details"]["source_page"], "click_product"),
+        ("payment method", chi_square_test, lambda d: d["details"]["payment_method"], "purchase_completed"),
+        ("user_id", ks_test, lambda d: d["user_id"], None),
+        ("timestamp", ks_test, epoch, None),
+        ("view product_id", ks_test, product, "view_product"),
+        ("price_at_view", ks_test, lambda d: d["details"]["price_at_view"], "view_product"),
+        ("time_spent_seconds", ks_test, lambda d: d["details"]["time_spent_seconds"], "view_product"),
+        ("price_unit", ks_test, lambda d: d["details"]["price_unit"], "add_to_cart"),
+        ("cart_value", ks_test, lambda d: d["details"]["cart_value"], "check_cart_status"),
+        ("cart total_items", ks_test, lambda d: d["details"]["total_items"], "check_cart_status"),
+        ("results_count", ks_test, lambda d: d["details"]["results_count"], "search"),
+        ("purchase total", ks_test, lambda d: d["details"]["total_amount"], "purchase_completed"),
+        ("purchase items", ks_test, lambda d: d["details"]["items_count"], "purchase_completed"),
+    ]
+
+    print(f"{'field':<20} | {'test':<10} | {'statistic':>10} | {'p-value':>8} | result")
+    passed = True
+    for label, test, field, event_type in checks:
+        stat, p = test(column(samples["python"], field, event_type), column(samples["numpy"], field, event_type))
+        ok = p >= SIGNIFICANCE
+        passed = passed and ok
+        kind = "chi-square" if test is chi_square_test else "ks"
+        print(f"{label:<20} | {kind:<10} | {stat:>10.4f} | {p:>8.4f} | {'same' if ok else 'DIFFERENT'}")
+    print(f"python engine: {rates['python']:,.0f} events/sec, numpy engine: {rates['numpy']:,.0f} events/sec "
+          f"({rates['numpy'] / rates['python']:.1f}x)")
+    print("distributions match" if passed else f"distributions differ at p < {SIGNIFICANCE}")
+    return passed
+
+# split num_logs into near-equal, contiguous per-worker counts
+def partition(num_logs, workers):
+    base, extra = divmod(num_logs, workers)
+    return [base + (1 if w < extra else 0) for w in range(workers)]
+
+# runs in a worker process: its own seeded rng stream and its own shard files
+def generate_worker(worker, count, seed, end_time, engine, fmt, compress, shard_size, base):
+    global END_TIME
+    END_TIME = end_time
+    logs = generate_lines(count, engine, seed, worker)
+    return write_logs(logs, fmt, compress, shard_size, f"{base}-w{worker:02d}")
+
+def main():
+    global END_TIME
+    parser = argparse.ArgumentParser(description="Generate user behavior logs.")
+    parser.add_argument("--num-logs", type=int, default=NUM_LOGS, help="number of events to generate")
+    parser.add_argument("--format", choices=list(EXTENSIONS), default="json",
+                        help="a single json array or newline-delimited json")
+    parser.add_argument("--compress", choices=list(COMPRESSION_SUFFIXES), default="none")
+    parser.add_argument("--shard-size", type=int, default=0, help="events per shard file (0 = one file)")
+    parser.add_argument("--output", type=str, default=OUTPUT_BASE, help="output file name without extension")
+    parser.add_argument("--workers", type=int, default=1, help="generator processes, each writes its own shards")
+    parser.add_argument("--seed", type=int, help="seed for reproducible output (per seed and worker count)")
+    parser.add_argument("--end-time", type=str, help="anchor of the 30-day window, e.g. 2025-01-01T00:00:00")
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python",
+                        help="per-event python generator or vectorised numpy batches")
+    parser.add_argument("--check-distribution", type=int, metavar="N",
+                        help="compare N events from both engines statistically instead of writing files")
+    args = parser.parse_args()
+
+    END_TIME = datetime.fromisoformat(args.end_time) if args.end_time else datetime.utcnow().replace(microsecond=0)
+    if args.check_distribution:
+        raise SystemExit(0 if check_distribution(args.check_distribution, args.seed) else 1)
+    print(f"generating {args.num_logs} aligned user behavior logs.")
+    start = time.perf_counter()
+    if args.workers > 1:
+        counts = partition(args.num_logs, args.workers)
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [
+                pool.submit(generate_worker, w, count, args.seed, END_TIME, args.engine, args.format,
+                            args.compress, args.shard_size, args.output)
+                for w, count in enumerate(counts)
+            ]
+            paths = [path for future in futures for path in future.result()]
+    else:
+        logs = generate_lines(args.num_logs, args.engine, args.seed)
+        paths = write_logs(logs, args.format, args.compress, args.shard_size, args.output)
+    elapsed = time.perf_counter() - start
+
+    if len(paths) == 1:
+        print(f"logs saved to '{paths[0]}'")
+    else:
+        print(f"logs saved to {len(paths)} shards: '{paths[0]}' .. '{paths[-1]}'")
+    print(f"generated {args.num_logs} events in {elapsed:.1f}s ({args.num_logs / elapsed:,.0f} events/sec)")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 # base generated from Gemini: https://gemini.google.com/share/600de4cc1ff1
 # had to modify to work with our schema
+import argparse
+import io
 import psycopg2
 from psycopg2 import extras
 from pymongo import MongoClient
-from faker import Faker
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
 # configuration
@@ -21,6 +24,15 @@ MONGO_COLLECTION = "products"
 
 NUM_ORDERS = 100000 
 BATCH_SIZE = 10000
+BULK_CHUNK_SIZE = 20000
+MAX_ITEMS_PER_ORDER = 5
+
+# column lists for the COPY based bulk loader
+ORDER_COLUMNS = ("order_id", "user_id", "status", "created_at", "tax_amount", "shipping_cost", "total_amount")
+ITEM_COLUMNS = ("order_id", "sku", "mongo_product_id", "quantity", "unit_price_at_purchase")
+RETURN_COLUMNS = ("order_id", "sku", "quantity", "reason", "refund_amount", "status")
+# parallel workers write explicit ids instead of drawing from the sequences
+SERIAL_TABLES = (("orders", "order_id"), ("order_items", "order_item_id"), ("returns", "return_id"))
 
 def get_pg_connection():
     return psycopg2.connect(host=PG_HOST, database=PG_NAME, user=PG_USER, password=PG_PASS, port=PG_PORT)
@@ -28,7 +40,7 @@ def get_pg_connection():
 def populate_inventory(mongo_col, pg_conn, pg_cur):
     print("reading products from mongodb.")
     # fetch all products with relevant fields
-    mongo_products = list(mongo_col.find({}, {"_id": 1, "variants": 1, "price": 1, "stock_level": 1}))
+    mongo_products = list(mongo_col.find({}, {"_id": 1, "variants": 1, "price": 1, "stock_level": 1}).sort("_id", 1))
     
     inventory_data = []
     for prod in mongo_products:
@@ -64,46 +76,78 @@ def populate_inventory(mongo_col, pg_conn, pg_cur):
 
     return inventory_data
 
-def generate_orders(pg_conn, pg_cur, inventory_list):
+def fetch_users(pg_cur):
     print("fetching User IDs.")
-    pg_cur.execute("SELECT user_id FROM Users;")
-    users = [row[0] for row in pg_cur.fetchall()]
+    pg_cur.execute("SELECT user_id FROM Users ORDER BY user_id;")
+    return [row[0] for row in pg_cur.fetchall()]
+
+# draw one order in python: user, date, status, items, totals and the optional return
+# both write paths call this in the same order, so a seeded run yields the same rows
+def build_order(users, inv_lookup, window):
+    user_id = random.choice(users)
+    # uniform in the window like faker's date_time_between, at a tenth of the cost per order
+    order_date = window[0] + (window[1] - window[0]) * random.random()
+    status = random.choice(['Pending', 'Shipped', 'Delivered', 'Returned'])
+
+    # pick items
+    num_items = random.randint(1, MAX_ITEMS_PER_ORDER)
+    selected_items = random.choices(inv_lookup, k=num_items)
+
+    items = []
+    order_total = 0
+    for sku, mongo_id, price in selected_items:
+        qty = random.randint(1, 3)
+        # schema requires: order_id, sku, mongo_product_id, quantity, unit_price_at_purchase
+        items.append((sku, mongo_id, qty, price))
+        order_total += (price * qty)
+
+    # order totals
+    tax = order_total * 0.08
+    shipping = 10.00 if order_total < 50 else 0.00
+    final_total = order_total + tax + shipping
+
+    # handle returns
+    order_return = None
+    if status == 'Returned':
+        r_sku, _, qty, r_price = random.choice(items)
+        r_qty = random.randint(1, qty)
+        order_return = (r_sku, r_qty, "Defective or Changed Mind", r_qty * r_price)
+
+    return {
+        "user_id": user_id, "status": status, "created_at": order_date,
+        "tax": tax, "shipping": shipping, "total": final_total,
+        "items": items, "return": order_return,
+    }
+
+def report_rate(label, rows, started):
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec)")
+
+def generate_orders(pg_conn, pg_cur, inventory_list, window):
+    users = fetch_users(pg_cur)
     if not users:
         print("error: no users found. Run generate_users.py first.")
         return
 
     print(f"generating {NUM_ORDERS} orders.")
-    fake = Faker()
     
     # pre-process inventory for fast lookup
     inv_lookup = [(item[0], item[1], float(item[3])) for item in inventory_list]
+    started = time.perf_counter()
+    rows = 0
 
     for i in range(NUM_ORDERS):
-        user_id = random.choice(users)
-        order_date = fake.date_time_between(start_date='-1y', end_date='now')
-        status = random.choice(['Pending', 'Shipped', 'Delivered', 'Returned'])
+        order = build_order(users, inv_lookup, window)
         
         # insert order header and get the id back (crucial for serial pk)
         pg_cur.execute("""
             INSERT INTO Orders (user_id, status, created_at, tax_amount, shipping_cost, total_amount)
             VALUES (%s, %s, %s, 0, 0, 0)
             RETURNING order_id;
-        """, (user_id, status, order_date))
+        """, (order["user_id"], order["status"], order["created_at"]))
         
         order_id = pg_cur.fetchone()[0]
-        
-        # pick items
-        num_items = random.randint(1, 5)
-        selected_items = random.choices(inv_lookup, k=num_items)
-        
-        order_items_data = []
-        order_total = 0
-        
-        for sku, mongo_id, price in selected_items:
-            qty = random.randint(1, 3)
-            # schema requires: order_id, sku, mongo_product_id, quantity, unit_price_at_purchase
-            order_items_data.append((order_id, sku, mongo_id, qty, price))
-            order_total += (price * qty)
+        order_items_data = [(order_id, sku, mongo_id, qty, price) for sku, mongo_id, qty, price in order["items"]]
             
         # insert items (batch insert for this specific order)
         item_query = """
@@ -113,25 +157,19 @@ def generate_orders(pg_conn, pg_cur, inventory_list):
         extras.execute_values(pg_cur, item_query, order_items_data)
 
         # update order totals
-        tax = order_total * 0.08
-        shipping = 10.00 if order_total < 50 else 0.00
-        final_total = order_total + tax + shipping
-        
         pg_cur.execute("""
             UPDATE Orders SET tax_amount=%s, shipping_cost=%s, total_amount=%s WHERE order_id=%s
-        """, (tax, shipping, final_total, order_id))
+        """, (order["tax"], order["shipping"], order["total"], order_id))
+        rows += 1 + len(order_items_data)
 
         # handle returns
-        if status == 'Returned':
-            item = random.choice(order_items_data)
-            r_sku = item[1]
-            r_qty = random.randint(1, item[3])
-            r_price = item[4]
-            refund = r_qty * r_price
+        if order["return"]:
+            r_sku, r_qty, reason, refund = order["return"]
             pg_cur.execute("""
                 INSERT INTO Returns (order_id, sku, quantity, reason, refund_amount, status)
                 VALUES (%s, %s, %s, %s, %s, 'Completed')
-            """, (order_id, r_sku, r_qty, "Defective or Changed Mind", refund))
+            """, (order_id, r_sku, r_qty, reason, refund))
+            rows += 1
 
         # commit every batch size
         if i % BATCH_SIZE == 0:
@@ -140,8 +178,226 @@ def generate_orders(pg_conn, pg_cur, inventory_list):
 
     pg_conn.commit()
     print(f"finished. total orders: {NUM_ORDERS}")
+    report_rate("per-order insert", rows, started)
+
+# copy text format: tab separated, \N for null, backslash escapes
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def copy_line(values):
+    return "\t".join(copy_value(v) for v in values) + "\n"
+
+# the generated strings almost never need escaping, only pay for the replaces when they do
+def copy_text(value):
+    if "\\" in value or "\t" in value or "\n" in value or "\r" in value:
+        return copy_value(value)
+    return value
+
+# one f-string per row for the bulk paths, the same text copy_line produces for these tuples
+# without its per-value type dispatch (ints and datetimes print as str(), floats as repr())
+def order_line(order_id, order):
+    return (f"{order_id}\t{order['user_id']}\t{copy_text(order['status'])}\t{order['created_at']}\t"
+            f"{order['tax']!r}\t{order['shipping']!r}\t{order['total']!r}\n")
+
+def item_line(order_id, item, item_id=None):
+    sku, mongo_id, qty, price = item
+    prefix = "" if item_id is None else f"{item_id}\t"
+    return f"{prefix}{order_id}\t{copy_text(sku)}\t{copy_text(mongo_id)}\t{qty}\t{price!r}\n"
+
+def return_line(order_id, order_return, return_id=None):
+    sku, qty, reason, refund = order_return
+    prefix = "" if return_id is None else f"{return_id}\t"
+    return f"{prefix}{order_id}\t{copy_text(sku)}\t{qty}\t{copy_text(reason)}\t{refund!r}\tCompleted\n"
+
+def copy_rows(pg_cur, table, columns, buffer):
+    buffer.seek(0)
+    pg_cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+# take the next n order ids from the sequence in one statement
+def reserve_order_ids(pg_cur, n):
+    pg_cur.execute("""
+        SELECT nextval(pg_get_serial_sequence('orders', 'order_id')) FROM generate_series(1, %s);
+    """, (n,))
+    return sorted(row[0] for row in pg_cur.fetchall())
+
+# foreign keys on the copied tables: checked row by row they cost more than the COPY itself,
+# so the bulk path drops them inside its transaction and adds them back at the end, where
+# postgres validates every row with one join per constraint
+BULK_FK_TABLES = ("orders", "order_items", "returns")
+
+def drop_foreign_keys(pg_cur, tables=BULK_FK_TABLES):
+    pg_cur.execute("""
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE contype = 'f' AND conrelid::regclass::text = ANY(%s) ORDER BY conname;
+    """, (list(tables),))
+    keys = pg_cur.fetchall()
+    for table, name, _ in keys:
+        pg_cur.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}";')
+    return keys
+
+def restore_foreign_keys(pg_cur, keys):
+    for table, name, definition in keys:
+        pg_cur.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition};')
+
+# bulk path: ids reserved from the sequence per chunk, everything computed in python
+# and streamed with COPY, one round trip per table per chunk
+# the whole load is one transaction: the constraints come back with the rows or, on any
+# error, the rollback restores them and discards every chunk
+def generate_orders_bulk(pg_conn, pg_cur, inventory_list, window, chunk_size=BULK_CHUNK_SIZE):
+    users = fetch_users(pg_cur)
+    if not users:
+        print("error: no users found. Run generate_users.py first.")
+        return
+
+    print(f"generating {NUM_ORDERS} orders with COPY in chunks of {chunk_size}.")
+    inv_lookup = [(item[0], item[1], float(item[3])) for item in inventory_list]
+    started = time.perf_counter()
+    rows = 0
+
+    try:
+        foreign_keys = drop_foreign_keys(pg_cur)
+        for chunk_start in range(0, NUM_ORDERS, chunk_size):
+            order_ids = reserve_order_ids(pg_cur, min(chunk_size, NUM_ORDERS - chunk_start))
+            orders_buf, items_buf, returns_buf = io.StringIO(), io.StringIO(), io.StringIO()
+            for order_id in order_ids:
+                order = build_order(users, inv_lookup, window)
+                orders_buf.write(order_line(order_id, order))
+                for item in order["items"]:
+                    items_buf.write(item_line(order_id, item))
+                rows += len(order["items"])
+                if order["return"]:
+                    returns_buf.write(return_line(order_id, order["return"]))
+                    rows += 1
+            rows += len(order_ids)
+
+            copy_rows(pg_cur, "Orders", ORDER_COLUMNS, orders_buf)
+            copy_rows(pg_cur, "Order_Items", ITEM_COLUMNS, items_buf)
+            copy_rows(pg_cur, "Returns", RETURN_COLUMNS, returns_buf)
+            print(f"generated {chunk_start + len(order_ids)} orders...")
+
+        print(f"validating {len(foreign_keys)} foreign keys.")
+        restore_foreign_keys(pg_cur, foreign_keys)
+        pg_conn.commit()
+    except Exception:
+        pg_conn.rollback()
+        raise
+
+    print(f"finished. total orders: {NUM_ORDERS}")
+    report_rate("bulk copy", rows, started)
+
+def partition(num_orders, workers):
+    base, extra = divmod(num_orders, workers)
+    return [base + (1 if w < extra else 0) for w in range(workers)]
+
+# highest id already used in each serial table, new ids start above these
+def current_max_ids(pg_cur):
+    bases = {}
+    for table, column in SERIAL_TABLES:
+        pg_cur.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table};")
+        bases[table] = pg_cur.fetchone()[0]
+    return bases
+
+# runs in a worker process with its own connection and its own seeded random stream
+# order n of the whole run (0-based) always gets the same ids, whichever worker draws it:
+#   order_id      = orders base + n + 1
+#   order_item_id = order_items base + n * MAX_ITEMS_PER_ORDER + k + 1
+#   return_id     = returns base + n + 1 (at most one return per order)
+# so workers never touch the sequences or each other's rows, the gaps are fixed up afterwards
+def generate_orders_worker(worker, first, count, bases, users, inv_lookup, window, chunk_size, seed):
+    random.seed(None if seed is None else f"{seed}:{worker}")
+    pg_conn = get_pg_connection()
+    pg_cur = pg_conn.cursor()
+    started = time.perf_counter()
+    rows = 0
+    try:
+        for chunk_start in range(first, first + count, chunk_size):
+            orders_buf, items_buf, returns_buf = io.StringIO(), io.StringIO(), io.StringIO()
+            chunk_end = min(chunk_start + chunk_size, first + count)
+            for n in range(chunk_start, chunk_end):
+                order = build_order(users, inv_lookup, window)
+                order_id = bases["orders"] + n + 1
+                orders_buf.write(order_line(order_id, order))
+                item_base = bases["order_items"] + n * MAX_ITEMS_PER_ORDER
+                for k, item in enumerate(order["items"]):
+                    items_buf.write(item_line(order_id, item, item_base + k + 1))
+                rows += len(order["items"])
+                if order["return"]:
+                    returns_buf.write(return_line(order_id, order["return"], bases["returns"] + n + 1))
+                    rows += 1
+            rows += chunk_end - chunk_start
+
+            copy_rows(pg_cur, "Orders", ORDER_COLUMNS, orders_buf)
+            copy_rows(pg_cur, "Order_Items", ("order_item_id",) + ITEM_COLUMNS, items_buf)
+            copy_rows(pg_cur, "Returns", ("return_id",) + RETURN_COLUMNS, returns_buf)
+            pg_conn.commit()
+            print(f"worker {worker}: generated {chunk_end - first} of {count} orders...")
+    finally:
+        pg_cur.close()
+        pg_conn.close()
+    return rows, time.perf_counter() - started
+
+# move every sequence past the explicit ids and refresh planner stats for the new rows
+def finalize_orders(pg_conn, pg_cur):
+    for table, column in SERIAL_TABLES:
+        pg_cur.execute(f"""
+            SELECT setval(pg_get_serial_sequence('{table}', '{column}'), COALESCE(MAX({column}), 0) + 1, false)
+            FROM {table};
+        """)
+    pg_cur.execute("ANALYZE orders, order_items, returns;")
+    pg_conn.commit()
+
+# parallel path: NUM_ORDERS split across worker processes, each copying its own id range
+def generate_orders_parallel(pg_conn, pg_cur, inventory_list, window, workers, chunk_size=BULK_CHUNK_SIZE, seed=None):
+    users = fetch_users(pg_cur)
+    if not users:
+        print("error: no users found. Run generate_users.py first.")
+        return
+
+    print(f"generating {NUM_ORDERS} orders across {workers} workers.")
+    inv_lookup = [(item[0], item[1], float(item[3])) for item in inventory_list]
+    bases = current_max_ids(pg_cur)
+    counts = partition(NUM_ORDERS, workers)
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        first = 0
+        for w, count in enumerate(counts):
+            futures.append(pool.submit(generate_orders_worker, w, first, count, bases, users, inv_lookup,
+                                       window, chunk_size, seed))
+            first += count
+        results = [f.result() for f in futures]
+
+    for w, (rows, elapsed) in enumerate(results):
+        print(f"worker {w}: {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec)")
+    print("fixing up sequences and analyzing tables.")
+    finalize_orders(pg_conn, pg_cur)
+    print(f"finished. total orders: {NUM_ORDERS}")
+    report_rate(f"parallel copy ({workers} workers)", sum(rows for rows, _ in results), started)
 
 def main():
+    global NUM_ORDERS
+    parser = argparse.ArgumentParser(description="Populate inventory and generate orders.")
+    parser.add_argument("--num-orders", type=int, default=NUM_ORDERS)
+    parser.add_argument("--bulk", action="store_true", help="stream orders with COPY instead of per-order INSERTs")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="orders per COPY chunk")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="split the orders across this many processes, each with its own connection")
+    parser.add_argument("--seed", type=int, help="seed python's random for reproducible rows")
+    parser.add_argument("--end-time", type=str, help="end of the one-year order window, e.g. 2025-01-01T00:00:00")
+    args = parser.parse_args()
+    NUM_ORDERS = args.num_orders
+
+    # orders fall in the year before a fixed anchor, so seeded runs repeat exactly
+    end_time = datetime.fromisoformat(args.end_time) if args.end_time else datetime.now().replace(microsecond=0)
+    window = (end_time - timedelta(days=365), end_time)
+    if args.seed is not None:
+        random.seed(args.seed)
+
     # connect to mongo
     try:
         mongo_client = MongoClient(MONGO_URI)
@@ -164,8 +420,12 @@ def main():
     # execution flow
     try:
         inventory_data = populate_inventory(mongo_col, pg_conn, pg_cur)
-        if inventory_data:
-            generate_orders(pg_conn, pg_cur, inventory_data)
+        if inventory_data and args.workers > 1:
+            generate_orders_parallel(pg_conn, pg_cur, inventory_data, window, args.workers, args.chunk_size, args.seed)
+        elif inventory_data and args.bulk:
+            generate_orders_bulk(pg_conn, pg_cur, inventory_data, window, args.chunk_size)
+        elif inventory_data:
+            generate_orders(pg_conn, pg_cur, inventory_data, window)
             
     finally:
         if pg_cur: pg_cur.close()
@@ -173,4 +433,6 @@ def main():
         if mongo_client: mongo_client.close()
 
 # running script
-main()
+if __name__ == "__main__":
+    main()
+
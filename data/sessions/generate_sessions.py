@@ -1,33 +1,30 @@
 # base generated from Gemini: https://gemini.google.com/share/4b1fd1f88388
+import argparse
+import os
+import sys
 import redis
-import json
 import random
 import time
 from faker import Faker
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from carts import AGGREGATE_KEYS, CART_PATTERN, CART_TTL, ENCODINGS, PIPELINE_SIZE, UNLINK_BATCH, cart_key, \
+    encode_cart, write_carts, clear_carts, memory_usage
+
 # configuration
 REDIS_HOST = "localhost"
 REDIS_PORT = 6379
 NUM_SESSIONS = 500
+MEMORY_SAMPLE = 200
 fake = Faker()
 
 def get_redis_client():
     return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
 
-def generate_sessions():
-    r = get_redis_client()
-    print(f"connecting to redis at {REDIS_HOST}:{REDIS_PORT}")
-    
-    # clear existing sessions to avoid stale data
-    print("clearing existing 'cart:*' keys...")
-    for key in r.scan_iter("cart:*"):
-        r.delete(key)
-
-    print(f"generating {NUM_SESSIONS} active sessions...")
-    
+def generate_carts(num_sessions):
     devices = ['laptop', 'tablet', 'mobile', 'desktop']
     
-    for _ in range(NUM_SESSIONS):
+    for _ in range(num_sessions):
         # simulate a session
         session_id = fake.uuid4()
         user_id = random.randint(1, 1000)
@@ -52,22 +49,86 @@ def generate_sessions():
             cart_items.append(item)
             total_amount += (price * qty)
 
-        # store in redis as a hash
-        cart_key = f"cart:{session_id}"
-        cart_data = {
+        yield session_id, {
             "user_id": user_id,
             "device": device,
-            "items": json.dumps(cart_items),
-            "total_amount": round(total_amount, 2),
+            "items": cart_items,
+            "total_amount": total_amount,
             "last_active": int(time.time())
         }
-        r.hset(cart_key, mapping=cart_data)
-        r.expire(cart_key, 3600)
 
-    print("session generation complete.")
+# original one-command-per-round-trip path, kept to compare round trips against
+def generate_sessions_unbatched(r, num_sessions):
+    r.unlink(*AGGREGATE_KEYS)
+    round_trips = 1
+    for key in r.scan_iter(CART_PATTERN):
+        r.delete(key)
+        round_trips += 1
+    for session_id, cart in generate_carts(num_sessions):
+        r.hset(cart_key(session_id), mapping=encode_cart(cart))
+        r.expire(cart_key(session_id), CART_TTL)
+        round_trips += 2
+    return round_trips
+
+# store the same sample of carts once per encoding under scratch keys and compare MEMORY USAGE
+def compare_memory(r, sample_size=MEMORY_SAMPLE):
+    carts = list(generate_carts(sample_size))
+    print(f"memory per cart over {sample_size} carts:")
+    for encoding in ENCODINGS:
+        prefix = f"memcmp:{encoding}:"
+        write_carts(r, carts, encoding=encoding, prefix=prefix, aggregates=False)
+        keys = [cart_key(session_id, prefix) for session_id, _ in carts]
+        usage = memory_usage(r, keys)
+        r.unlink(*keys)
+        print(f"  {encoding:<8} {sum(usage) / len(usage):>8.1f} bytes avg, {max(usage)} max")
+
+def generate_sessions(num_sessions=NUM_SESSIONS, pipeline_size=PIPELINE_SIZE, unlink_batch=UNLINK_BATCH,
+                      unbatched=False, encoding="json"):
+    r = get_redis_client()
+    print(f"connecting to redis at {REDIS_HOST}:{REDIS_PORT}")
+    started = time.perf_counter()
+
+    if unbatched:
+        print(f"generating {num_sessions} active sessions one command at a time...")
+        round_trips = generate_sessions_unbatched(r, num_sessions)
+    else:
+        # clear existing sessions to avoid stale data
+        print("clearing existing 'cart:*' keys...")
+        removed, clear_trips = clear_carts(r, unlink_batch)
+        print(f"unlinked {removed} keys in {clear_trips} round trips")
+
+        print(f"generating {num_sessions} active sessions ({encoding} carts)...")
+        write_trips = write_carts(r, generate_carts(num_sessions), pipeline_size, encoding=encoding)
+        round_trips = clear_trips + write_trips
+
+    elapsed = time.perf_counter() - started
+    print(f"session generation complete: {round_trips} round trips "
+          f"({round_trips / max(num_sessions, 1):.3f} per cart) in {elapsed:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate shopping cart sessions in redis.")
+    parser.add_argument("--num-sessions", type=int, default=NUM_SESSIONS)
+    parser.add_argument("--pipeline-size", type=int, default=PIPELINE_SIZE, help="carts per pipeline")
+    parser.add_argument("--unlink-batch", type=int, default=UNLINK_BATCH, help="keys per UNLINK when clearing")
+    parser.add_argument("--unbatched", action="store_true",
+                        help="issue one command per round trip, for comparing against the pipelined path "
+                             "(these carts skip the index and aggregates, query 7 will not list them)")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="json",
+                        help="json: items as one JSON field, compact: one packed field per item plus counters")
+    parser.add_argument("--compare-memory", action="store_true",
+                        help="report MEMORY USAGE per cart for each encoding and exit")
+    args = parser.parse_args()
+
+    if args.compare_memory:
+        compare_memory(get_redis_client())
+        return
+
+    # generating sessions
+    try:
+        generate_sessions(args.num_sessions, args.pipeline_size, args.unlink_batch, args.unbatched,
+                          args.encoding)
+    except Exception as e:
+        print(f"error generating sessions: {e}")
 
-# generating sessions
-try:
-    generate_sessions()
-except Exception as e:
-    print(f"error generating sessions: {e}")
+if __name__ == "__main__":
+    main()
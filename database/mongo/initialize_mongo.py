@@ -1,13 +1,208 @@
+import argparse
+import glob
+import gzip
+import io
 import json
 import pymongo
 import os
+import resource
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pymongo.errors import BulkWriteError
+
+from rollups import EVENT_FIELDS, apply_rollups, create_rollup_indexes, drop_rollups, event_layout
 
 MONGO_URI = "mongodb://localhost:27017/"
 DB_NAME = "ecommerce_db"
 PRODUCTS_FILE = "data/products/products.json" 
 LOGS_FILE = "data/logs/user_behavior_logs.json"
 
-def initialize_mongo():
+# user_events layout: "flat" documents, or a time-series collection bucketed by
+# meta = {user_id, event_type}; events for one user and type arrive hours apart, hence the granularity
+LAYOUTS = ("flat", "timeseries")
+TIMESERIES_OPTIONS = {"timeField": "timestamp", "metaField": "meta", "granularity": "hours"}
+
+# streaming ingest configuration
+BATCH_SIZE = 5000
+WRITER_THREADS = 4
+READ_CHUNK_SIZE = 1 << 20
+
+# index definitions: (collection, keys, options)
+# applied after the bulk load so inserts do not pay for index maintenance
+INDEXES = [
+    # query 1 filters on category, query 4 on category plus one of three variant/attribute fields
+    ("products", [("category", 1), ("variants.color", 1)], {"name": "category_variant_color"}),
+    ("products", [("category", 1), ("variants.size", 1)], {"name": "category_variant_size"}),
+    ("products", [("category", 1), ("attributes.size", 1)], {"name": "category_attribute_size"}),
+    # query 2: a user's recent product views, only view events are indexed
+    ("user_events", [("user_id", 1), ("timestamp", -1)], {
+        "name": "user_recent_views",
+        "partialFilterExpression": {"event_type": "view_product"},
+    }),
+    # query 6 and any other per-user, per-event-type lookup
+    ("user_events", [("user_id", 1), ("event_type", 1), ("timestamp", -1)], {"name": "user_event_time"}),
+]
+
+# on a time-series user_events the index keys move under meta, and partial filters are
+# dropped since they may only reference the metaField there
+def apply_indexes(db):
+    layout = event_layout(db)
+    for collection, keys, options in INDEXES:
+        if collection == "user_events" and layout == "timeseries":
+            keys = [(EVENT_FIELDS[layout].get(field, field), direction) for field, direction in keys]
+            options = {k: v for k, v in options.items() if k != "partialFilterExpression"}
+        name = db[collection].create_index(keys, **options)
+        print(f"index {collection}.{name} ready")
+    create_rollup_indexes(db)
+
+def create_events_collection(db, layout):
+    db.user_events.drop()
+    if layout == "timeseries":
+        db.create_collection("user_events", timeseries=TIMESERIES_OPTIONS)
+
+# event as stored in a time-series user_events, the flat document is left untouched for the rollups
+def to_timeseries(document):
+    shaped = {k: v for k, v in document.items() if k not in ("user_id", "event_type")}
+    shaped["meta"] = {"user_id": document.get("user_id"), "event_type": document.get("event_type")}
+    return shaped
+
+# yields documents one at a time from either a json array or ndjson file
+# the array case is decoded incrementally, so only one read chunk plus the
+# document being parsed is ever held in memory
+def iter_json_documents(f):
+    first = f.read(1)
+    while first.isspace():
+        first = f.read(1)
+    if first != "[":
+        # newline-delimited json, one document per line
+        line = first + f.readline()
+        while line:
+            if line.strip():
+                yield json.loads(line)
+            line = f.readline()
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_CHUNK_SIZE)
+    pos = 0
+    while True:
+        # skip separators, pulling in more input when the buffer runs dry
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ","):
+                pos += 1
+            if pos < len(buffer):
+                break
+            buffer, pos = f.read(READ_CHUNK_SIZE), 0
+            if not buffer:
+                raise ValueError("unterminated json array")
+        if buffer[pos] == "]":
+            return
+        try:
+            document, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # document is cut off at the end of the chunk
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield document
+        pos = end
+
+# open a log file as text, decompressing .gz / .zst shards on the fly
+def open_input(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("error: reading .zst logs needs the 'zstandard' package (pip install zstandard)")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+                                encoding="utf-8")
+    return open(path, "r")
+
+# chain the documents of every matching log file, shards in name order
+def iter_log_files(paths):
+    for path in paths:
+        with open_input(path) as f:
+            yield from iter_json_documents(f)
+
+# event timestamps arrive as ISO strings ("2025-01-31T23:59:59Z") and are stored as BSON dates,
+# so queries use date operators and range scans instead of parsing strings per document
+def parse_timestamps(documents):
+    for document in documents:
+        timestamp = document.get("timestamp")
+        if isinstance(timestamp, str):
+            document["timestamp"] = datetime.fromisoformat(timestamp[:19])
+        yield document
+
+# convert events loaded before timestamps were dates, in place on the server
+# a pipeline update, so no document leaves the database
+def migrate_timestamps(db):
+    if event_layout(db) == "timeseries":
+        print("user_events is a time-series collection, its timestamps are already dates")
+        return 0
+    start = time.perf_counter()
+    result = db.user_events.update_many(
+        {"timestamp": {"$type": "string"}},
+        [{"$set": {"timestamp": {"$dateFromString": {"dateString": "$timestamp"}}}}],
+    )
+    print(f"converted {result.modified_count} event timestamps to dates in {time.perf_counter() - start:.1f}s")
+    return result.modified_count
+
+def batched(documents, size):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# insert a batch, then fold the documents that landed into the rollup collections
+def insert_batch(collection, batch, shape=None):
+    try:
+        documents = [shape(doc) for doc in batch] if shape else batch
+        inserted = len(collection.insert_many(documents, ordered=False).inserted_ids)
+        landed = batch
+    except BulkWriteError as e:
+        # unordered inserts keep going past duplicates, count what landed
+        errors = e.details.get("writeErrors", [])
+        print(f"batch had {len(errors)} write errors")
+        failed = {error["index"] for error in errors}
+        inserted = e.details.get("nInserted", 0)
+        landed = [doc for i, doc in enumerate(batch) if i not in failed]
+    apply_rollups(collection.database, landed)
+    return inserted
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# stream documents into a collection through a pool of writer threads
+# at most two batches per writer are in flight, which bounds memory
+def stream_into(collection, documents, batch_size=BATCH_SIZE, writers=WRITER_THREADS, shape=None):
+    inserted = 0
+    next_report = 50000
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        pending = set()
+        for batch in batched(documents, batch_size):
+            if len(pending) >= writers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                inserted += sum(future.result() for future in done)
+                if inserted >= next_report:
+                    print(f"inserted {inserted} logs")
+                    next_report += 50000
+            pending.add(pool.submit(insert_batch, collection, batch, shape))
+        done, _ = wait(pending)
+        inserted += sum(future.result() for future in done)
+    elapsed = time.perf_counter() - start
+    return inserted, elapsed
+
+def initialize_mongo(batch_size=BATCH_SIZE, writers=WRITER_THREADS, logs_pattern=LOGS_FILE, layout="flat"):
     print("connecting to mongodb")
     client = pymongo.MongoClient(MONGO_URI)
     db = client[DB_NAME]
@@ -22,33 +217,50 @@ def initialize_mongo():
         db.products.drop()
         db.products.insert_many(product_data)
         print("products loaded successfully.")
-
-        # create index for faster lookups
-        db.products.create_index("_id")
     else:
         print(f"error: could not find {PRODUCTS_FILE}")
 
     # load the user logs
-    if os.path.exists(LOGS_FILE):
-        print(f"reading {LOGS_FILE}")
-        with open(LOGS_FILE, "r") as f:
-            log_data = json.load(f)
-            
-        print(f"inserting {len(log_data)} logs")
-        db.user_events.drop() 
+    log_files = sorted(glob.glob(logs_pattern))
+    if log_files:
+        print(f"streaming {len(log_files)} log file(s) into a {layout} user_events with {writers} writers, "
+              f"batches of {batch_size}")
+        create_events_collection(db, layout)
+        drop_rollups(db)
         
-        # batch insert
-        batch_size = 5000
-        for i in range(0, len(log_data), batch_size):
-            batch = log_data[i:i + batch_size]
-            db.user_events.insert_many(batch)
-            if i % 50000 == 0:
-                print(f"inserted {i} logs")
-        print("logs loaded successfully.")
+        shape = to_timeseries if layout == "timeseries" else None
+        inserted, elapsed = stream_into(db.user_events, parse_timestamps(iter_log_files(log_files)), batch_size,
+                                        writers, shape)
+        rate = inserted / elapsed if elapsed else 0
+        print(f"logs loaded successfully: {inserted} docs in {elapsed:.1f}s "
+              f"({rate:,.0f} docs/sec, peak rss {peak_rss_mb():.0f} MB)")
     else:
-        print(f"error: could not find {LOGS_FILE}")
+        print(f"error: could not find {logs_pattern}")
+
+    # build indexes now that the bulk load is done
+    print("creating indexes")
+    apply_indexes(db)
 
     client.close()
 
 # running the script
-initialize_mongo()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load products and user events into MongoDB.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="documents per insert_many")
+    parser.add_argument("--writers", type=int, default=WRITER_THREADS, help="concurrent writer threads")
+    parser.add_argument("--logs", type=str, default=LOGS_FILE,
+                        help="log file or glob of shards (.json, .ndjson, optionally .gz/.zst)")
+    parser.add_argument("--layout", choices=LAYOUTS, default="flat",
+                        help="store user_events as plain documents or as a time-series collection")
+    parser.add_argument("--migrate-timestamps", action="store_true",
+                        help="only convert string timestamps already in user_events to dates, then exit")
+    args = parser.parse_args()
+    if args.migrate_timestamps:
+        client = pymongo.MongoClient(MONGO_URI)
+        try:
+            migrate_timestamps(client[DB_NAME])
+        finally:
+            client.close()
+    else:
+        initialize_mongo(args.batch_size, args.writers, args.logs, args.layout)
+
@@ -0,0 +1,192 @@
+import argparse
+import sys
+from collections import Counter
+
+import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+MONGO_URI = "mongodb://localhost:27017/"
+DB_NAME = "ecommerce_db"
+
+# summary collections kept next to user_events so queries read counters instead of raw events
+# each rollup is updated with $inc as batches are ingested, and can be rebuilt from
+# user_events with a server-side $group + $merge
+POPULARITY_COLLECTION = "product_popularity"
+
+# user_events is a plain collection or a time-series one whose metaField "meta" holds
+# {user_id, event_type} (initialize_mongo.py --layout), the pipelines and queries.py read fields through this
+EVENT_FIELDS = {
+    "flat": {"user_id": "user_id", "event_type": "event_type"},
+    "timeseries": {"user_id": "meta.user_id", "event_type": "meta.event_type"},
+}
+
+def event_layout(db):
+    info = next(db.list_collections(filter={"name": "user_events"}), None)
+    return "timeseries" if info and info.get("type") == "timeseries" else "flat"
+
+# cart abandonment: distinct sessions per day that added to cart / completed a purchase
+# a session is counted on the day of its event, so a window is the sum of its days
+# (exact unless a session crosses midnight)
+SESSION_DAYS_COLLECTION = "cart_session_days"
+ABANDONMENT_COLLECTION = "cart_activity_daily"
+ABANDONMENT_EVENTS = {"add_to_cart": "carts", "purchase_completed": "purchases"}
+
+# timestamps are BSON dates once loaded, older ISO strings are still understood
+def event_day(timestamp):
+    return timestamp[:10] if isinstance(timestamp, str) else timestamp.strftime("%Y-%m-%d")
+
+# two writer threads can race to create the same counter document, the loser gets a
+# duplicate key error (servers before 4.2 do not retry it), so re-run just those upserts
+def bulk_upsert(collection, operations, retries=3):
+    for _ in range(retries):
+        try:
+            collection.bulk_write(operations, ordered=False)
+            return
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            operations = [operations[error["index"]] for error in errors]
+    collection.bulk_write(operations, ordered=False)
+
+# product_popularity: {_id: product_id, views: n}
+def apply_popularity(db, events):
+    views = Counter(e["details"].get("product_id") for e in events if e.get("event_type") == "view_product")
+    operations = [UpdateOne({"_id": pid}, {"$inc": {"views": n}}, upsert=True) for pid, n in views.items()]
+    if operations:
+        bulk_upsert(db[POPULARITY_COLLECTION], operations)
+
+def popularity_pipeline(fields):
+    return [
+        {"$match": {fields["event_type"]: "view_product"}},
+        {"$group": {"_id": "$details.product_id", "views": {"$sum": 1}}},
+    ]
+
+# cart_session_days: one marker per {day, type, session} seen, its unique _id is what
+# dedupes sessions across batches and writer threads
+# cart_activity_daily: {_id: "YYYY-MM-DD", carts: n, purchases: n}, bumped only for new markers
+def apply_abandonment(db, events):
+    markers = {}
+    for e in events:
+        if e.get("event_type") in ABANDONMENT_EVENTS:
+            marker_id = {"day": event_day(e["timestamp"]), "type": e["event_type"], "session": e["session_id"]}
+            markers[tuple(marker_id.values())] = {"_id": marker_id}
+    if not markers:
+        return
+    markers = list(markers.values())
+    try:
+        db[SESSION_DAYS_COLLECTION].insert_many(markers, ordered=False)
+        new = markers
+    except BulkWriteError as e:
+        # duplicate keys are sessions already counted for that day
+        seen = {error["index"] for error in e.details.get("writeErrors", []) if error.get("code") == 11000}
+        if len(seen) < len(e.details.get("writeErrors", [])):
+            raise
+        new = [marker for i, marker in enumerate(markers) if i not in seen]
+
+    days = {}
+    for marker in new:
+        counts = days.setdefault(marker["_id"]["day"], dict.fromkeys(ABANDONMENT_EVENTS.values(), 0))
+        counts[ABANDONMENT_EVENTS[marker["_id"]["type"]]] += 1
+    operations = [UpdateOne({"_id": day}, {"$inc": counts}, upsert=True) for day, counts in days.items()]
+    if operations:
+        bulk_upsert(db[ABANDONMENT_COLLECTION], operations)
+
+def session_days_pipeline(fields):
+    return [
+        {"$match": {fields["event_type"]: {"$in": list(ABANDONMENT_EVENTS)}}},
+        {"$group": {"_id": {"day": {"$dateToString": {"format": "%Y-%m-%d", "date": {"$toDate": "$timestamp"}}},
+                            "type": "$" + fields["event_type"],
+                            "session": "$session_id"}}},
+    ]
+
+def abandonment_pipeline(fields):
+    return session_days_pipeline(fields) + [
+        {"$group": {"_id": "$_id.day", **{
+            field: {"$sum": {"$cond": [{"$eq": ["$_id.type", event_type]}, 1, 0]}}
+            for event_type, field in ABANDONMENT_EVENTS.items()
+        }}},
+    ]
+
+# every rollup: (collection, function folding a batch of events into it, pipeline recomputing it
+# from user_events), apply is None when another rollup's apply already maintains the collection
+ROLLUPS = [
+    (POPULARITY_COLLECTION, apply_popularity, popularity_pipeline),
+    (SESSION_DAYS_COLLECTION, None, session_days_pipeline),
+    (ABANDONMENT_COLLECTION, apply_abandonment, abandonment_pipeline),
+]
+
+# indexes the rollup readers rely on, as (collection, keys, options)
+ROLLUP_INDEXES = [
+    # query 5: top-N products straight off the popularity counters
+    (POPULARITY_COLLECTION, [("views", -1), ("_id", 1)], {"name": "views_desc"}),
+]
+
+def create_rollup_indexes(db):
+    for collection, keys, options in ROLLUP_INDEXES:
+        name = db[collection].create_index(keys, **options)
+        print(f"index {collection}.{name} ready")
+
+# fold a batch of freshly inserted events into every rollup
+# events are the flat documents as read from the logs, whatever the collection layout
+# each batch is pre-aggregated client side into one unordered bulk write per collection
+def apply_rollups(db, events):
+    for _, apply, _ in ROLLUPS:
+        if apply:
+            apply(db, events)
+
+def drop_rollups(db):
+    for collection, _, _ in ROLLUPS:
+        db[collection].drop()
+
+# rebuild every rollup from scratch on the server
+# dropping takes the indexes with the collections, they are rebuilt once the data is back
+def backfill_rollups(db):
+    fields = EVENT_FIELDS[event_layout(db)]
+    for collection, _, pipeline in ROLLUPS:
+        db[collection].drop()
+        db.user_events.aggregate(pipeline(fields) + [{"$merge": {"into": collection, "whenMatched": "replace"}}],
+                                 allowDiskUse=True)
+        print(f"backfilled {collection}: {db[collection].estimated_document_count()} documents")
+    create_rollup_indexes(db)
+
+# rollup _ids can be sub-documents, compare them as sorted tuples
+def _key(value):
+    return tuple(sorted(value.items())) if isinstance(value, dict) else value
+
+# compare each rollup against a full recomputation, returns a list of drift descriptions
+def check_rollups(db, show=10):
+    drift = []
+    fields = EVENT_FIELDS[event_layout(db)]
+    for collection, _, pipeline in ROLLUPS:
+        expected = {_key(doc["_id"]): doc for doc in db.user_events.aggregate(pipeline(fields), allowDiskUse=True)}
+        actual = {_key(doc["_id"]): doc for doc in db[collection].find()}
+        mismatched = [key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key)]
+        for key in mismatched[:show]:
+            drift.append(f"{collection} {key}: expected {expected.get(key)}, found {actual.get(key)}")
+        if len(mismatched) > show:
+            drift.append(f"{collection}: {len(mismatched) - show} more mismatched documents")
+        print(f"checked {collection}: {len(expected)} expected, {len(mismatched)} mismatched")
+    return drift
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or verify the user_events rollup collections.")
+    parser.add_argument("--backfill", action="store_true", help="recompute every rollup from user_events")
+    parser.add_argument("--check", action="store_true", help="compare the rollups against a full aggregation")
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient(MONGO_URI)
+    try:
+        db = client[DB_NAME]
+        if args.backfill:
+            backfill_rollups(db)
+        if args.check:
+            drift = check_rollups(db)
+            for line in drift:
+                print(line)
+            if drift:
+                sys.exit(1)
+            print("rollups match user_events")
+    finally:
+        client.close()
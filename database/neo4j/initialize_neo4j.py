@@ -1,8 +1,19 @@
+import argparse
+import csv
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
 import psycopg2
 from neo4j import GraphDatabase
 import pymongo
+import redis
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from recommendation_cache import REC_TTL, invalidate_recommendations, clear_recommendations
+
 # configuration
 PG_HOST = "localhost"
 PG_DB = "ecommerce_db"
@@ -17,12 +28,418 @@ MONGO_DB = "ecommerce_db"
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_AUTH = ("neo4j", "password")
 
-def initialize_graph():
+# redis configuration, holds the recommendation cache the sync invalidates
+REDIS_HOST = "localhost"
+REDIS_PORT = 6379
+
+# sync configuration
+ORDER_BATCH_SIZE = 1000
+CURSOR_ITERSIZE = 10000
+SYNC_STATE = "orders"
+BULK_WORKERS = 4
+
+CONSTRAINTS = [
+    "CREATE CONSTRAINT product_id IF NOT EXISTS FOR (p:Product) REQUIRE p.product_id IS UNIQUE",
+    "CREATE CONSTRAINT user_id IF NOT EXISTS FOR (u:User) REQUIRE u.user_id IS UNIQUE",
+    "CREATE CONSTRAINT order_id IF NOT EXISTS FOR (o:Order) REQUIRE o.order_id IS UNIQUE",
+    "CREATE CONSTRAINT sync_state IF NOT EXISTS FOR (s:SyncState) REQUIRE s.name IS UNIQUE",
+]
+
+# lookups by subcategory (e.g. every 'Headphones' product) instead of scanning names
+INDEXES = [
+    "CREATE INDEX product_subcategory IF NOT EXISTS FOR (p:Product) ON (p.subcategory)",
+]
+
+# query to create product nodes
+create_products_query = """
+UNWIND $batch AS row
+MERGE (p:Product {product_id: row.id})
+SET p.name = row.name, p.category = row.category, p.subcategory = row.subcategory
+"""
+
+# query to draw the graph
+# (User)-[:PLACED]->(Order)-[:CONTAINS]->(Product)
+# merges are index lookups thanks to the constraints, so a batch that is replayed is a no-op
+create_graph_query = """
+UNWIND $batch AS row
+MERGE (u:User {user_id: row.uid})
+MERGE (o:Order {order_id: row.oid})
+MERGE (u)-[:PLACED]->(o)
+WITH o, row
+UNWIND row.pids AS pid
+MATCH (p:Product {product_id: pid})
+MERGE (o)-[:CONTAINS]->(p)
+"""
+
+# bulk path for an empty graph: nodes and edges are deduplicated before they are sent,
+# so CREATE replaces MERGE and nothing is looked up except the endpoints by constraint index
+create_products_bulk_query = """
+UNWIND $batch AS row
+CREATE (:Product {product_id: row.id, name: row.name, category: row.category, subcategory: row.subcategory})
+"""
+create_users_bulk_query = """
+UNWIND $batch AS uid
+CREATE (:User {user_id: uid})
+"""
+create_orders_bulk_query = """
+UNWIND $batch AS row
+MATCH (u:User {user_id: row.uid})
+CREATE (u)-[:PLACED]->(:Order {order_id: row.oid})
+"""
+# every order touches ~3 of the same few thousand products, so CONTAINS is written by a single
+# writer with each batch's edges sorted by product, instead of by workers locking the same products
+create_contains_bulk_query = """
+UNWIND $batch AS row
+MATCH (p:Product {product_id: row.pid})
+MATCH (o:Order {order_id: row.oid})
+CREATE (o)-[:CONTAINS]->(p)
+"""
+
+# co-purchase projection: one (a)-[:BOUGHT_WITH {count}]->(b) per product pair, stored from the
+# lower product_id to the higher and read undirected, count is the number of orders holding both
+# "bought with X" is then one hop from X instead of a walk through every order containing it
+update_bought_with_query = """
+UNWIND $pairs AS pair
+MATCH (a:Product {product_id: pair.a})
+MATCH (b:Product {product_id: pair.b})
+MERGE (a)-[r:BOUGHT_WITH]->(b)
+ON CREATE SET r.count = pair.n
+ON MATCH SET r.count = r.count + pair.n
+"""
+build_bought_with_query = """
+MATCH (a:Product)
+CALL {
+    WITH a
+    MATCH (a)<-[:CONTAINS]-(:Order)-[:CONTAINS]->(b:Product)
+    WHERE a.product_id < b.product_id
+    WITH a, b, count(*) AS n
+    MERGE (a)-[r:BOUGHT_WITH]->(b)
+    SET r.count = n
+} IN TRANSACTIONS OF 100 ROWS
+"""
+clear_bought_with_query = "MATCH ()-[r:BOUGHT_WITH]->() CALL { WITH r DELETE r } IN TRANSACTIONS OF 10000 ROWS"
+existing_orders_query = "UNWIND $oids AS oid MATCH (o:Order {order_id: oid}) RETURN collect(o.order_id) AS existing"
+# a batch changes the BOUGHT_WITH counts of every product in it, and recommend_for_user sums those
+# counts over everything a user owns, so every owner of a touched product has a stale cached list
+product_owners_query = """
+UNWIND $pids AS pid
+MATCH (:Product {product_id: pid})<-[:CONTAINS]-(:Order)<-[:PLACED]-(u:User)
+RETURN collect(DISTINCT u.user_id) AS owners
+"""
+
+# high-water mark: the last order_id already in the graph
+read_sync_state_query = "MATCH (s:SyncState {name: $name}) RETURN s.last_order_id AS last_order_id"
+write_sync_state_query = """
+MERGE (s:SyncState {name: $name})
+SET s.last_order_id = $last_order_id, s.updated_at = datetime()
+"""
+
+def create_constraints(session):
+    for statement in CONSTRAINTS + INDEXES:
+        session.run(statement)
+
+def fetch_products(products_col):
+    return [
+        {"id": str(p["_id"]), "name": p.get("name", "Unknown"), "category": p.get("category", "General"),
+         "subcategory": p.get("subcategory")}
+        for p in products_col.find({}, {"_id": 1, "name": 1, "category": 1, "subcategory": 1})
+    ]
+
+def load_products(session, products_col):
+    # load products (nodes)
+    print("fetching products from mongo")
+    product_batch = fetch_products(products_col)
+    print(f"loading {len(product_batch)} products into neo4j")
+
+    # batch insert products
+    chunk_size = 5000
+    for i in range(0, len(product_batch), chunk_size):
+        chunk = product_batch[i:i + chunk_size]
+        session.run(create_products_query, batch=chunk)
+        print(f"   indexed {i + len(chunk)} products")
+
+def read_high_water_mark(session):
+    record = session.run(read_sync_state_query, name=SYNC_STATE).single()
+    return record["last_order_id"] if record and record["last_order_id"] is not None else 0
+
+# stream order items above the high-water mark (and up to `until`, for users in the (low, high]
+# range `users`) through a server-side cursor and group them into batches of whole orders,
+# rows arrive sorted by order_id so an order is never split
+def iter_order_batches(pg_conn, last_order_id, batch_size=ORDER_BATCH_SIZE, until=None, users=None):
+    conditions, params = ["o.order_id > %s"], [last_order_id]
+    if until is not None:
+        conditions.append("o.order_id <= %s")
+        params.append(until)
+    if users is not None:
+        conditions.append("o.user_id > %s AND o.user_id <= %s")
+        params.extend(users)
+    cur = pg_conn.cursor(name="graph_sync")
+    cur.itersize = CURSOR_ITERSIZE
+    cur.execute(f"""
+        SELECT o.user_id, o.order_id, i.mongo_product_id
+        FROM Orders o JOIN Order_Items i ON o.order_id = i.order_id
+        WHERE {" AND ".join(conditions)}
+        ORDER BY o.order_id;
+    """, params)
+
+    batch = []
+    current = None
+    for user_id, order_id, prod_id in cur:
+        if current is None or current["oid"] != order_id:
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+            current = {"oid": order_id, "uid": user_id, "pids": []}
+            batch.append(current)
+        current["pids"].append(prod_id)
+    if batch:
+        yield batch
+    cur.close()
+
+def run_counted(tx, query, **params):
+    counters = tx.run(query, **params).consume().counters
+    return counters.nodes_created, counters.relationships_created
+
+# BOUGHT_WITH increments for a batch of orders, pairs keyed (lower product_id, higher product_id)
+def co_purchase_pairs(batch):
+    pairs = Counter()
+    for order in batch:
+        pairs.update(combinations(sorted(set(order["pids"])), 2))
+    return [{"a": a, "b": b, "n": n} for (a, b), n in pairs.items()]
+
+# one write transaction per batch: the orders, their BOUGHT_WITH increments and the new
+# high-water mark commit together, so an interrupted sync resumes exactly after the last
+# committed batch, orders already in the graph are skipped so a replay never double counts
+# returns (nodes created, relationships created)
+def write_order_batch(tx, batch):
+    existing = set(tx.run(existing_orders_query, oids=[order["oid"] for order in batch]).single()["existing"])
+    new = [order for order in batch if order["oid"] not in existing]
+    nodes = relationships = 0
+    if new:
+        nodes, relationships = run_counted(tx, create_graph_query, batch=new)
+        pairs = co_purchase_pairs(new)
+        if pairs:
+            relationships += run_counted(tx, update_bought_with_query, pairs=pairs)[1]
+    tx.run(write_sync_state_query, name=SYNC_STATE, last_order_id=batch[-1]["oid"])
+    return nodes, relationships
+
+def has_relationship(session, rel_type):
+    return session.run(f"MATCH ()-[r:{rel_type}]->() RETURN r LIMIT 1").single() is not None
+
+# compute BOUGHT_WITH from the CONTAINS edges already in the graph, product by product
+def build_bought_with(session):
+    started = time.perf_counter()
+    session.run(clear_bought_with_query).consume()
+    session.run(build_bought_with_query).consume()
+    count = session.run("MATCH ()-[r:BOUGHT_WITH]->() RETURN count(r) AS n").single()["n"]
+    print(f"built {count} BOUGHT_WITH relationships in {time.perf_counter() - started:.1f}s")
+
+def report_graph_rate(label, nodes, relationships, elapsed):
+    if not elapsed:
+        return
+    print(f"{label}: {nodes} nodes ({nodes / elapsed:,.0f}/sec), "
+          f"{relationships} relationships ({relationships / elapsed:,.0f}/sec) in {elapsed:.1f}s")
+
+# the cache is an optimisation: if redis is unreachable the sync carries on and stale
+# recommendations age out with the TTL, returns the client or None once it has failed
+# a batch drops the keys of its products and of every user owning one (the buyers included)
+def invalidate_cache(r, batch=None, session=None):
+    try:
+        if batch is None:
+            clear_recommendations(r)
+        else:
+            pids = list({pid for order in batch for pid in order["pids"]})
+            owners = session.run(product_owners_query, pids=pids).single()["owners"]
+            invalidate_recommendations(r, owners + [order["uid"] for order in batch], pids)
+        return r
+    except redis.RedisError as e:
+        print(f"warning: recommendation cache not invalidated ({e}), cached results expire within {REC_TTL}s")
+        return None
+
+def sync_orders(driver, pg_conn, batch_size=ORDER_BATCH_SIZE, r=None):
+    with driver.session() as session:
+        last_order_id = read_high_water_mark(session)
+        print(f"syncing orders after order_id {last_order_id}")
+        started = time.perf_counter()
+        orders = items = nodes = relationships = 0
+        for batch in iter_order_batches(pg_conn, last_order_id, batch_size):
+            created = session.execute_write(write_order_batch, batch)
+            if r is not None:
+                r = invalidate_cache(r, batch, session)
+            nodes += created[0]
+            relationships += created[1]
+            orders += len(batch)
+            items += sum(len(order["pids"]) for order in batch)
+            if orders % 10000 < len(batch):
+                print(f"synced {orders} orders")
+    pg_conn.rollback()
+    elapsed = time.perf_counter() - started
+    print(f"synced {orders} new orders ({items} items) in {elapsed:.1f}s"
+          + (f", {orders / elapsed:,.0f} orders/sec" if orders and elapsed else ""))
+    report_graph_rate("incremental sync", nodes, relationships, elapsed)
+    return orders
+
+def get_pg_connection():
+    return psycopg2.connect(host=PG_HOST, database=PG_DB, user=PG_USER, password=PG_PASS)
+
+def graph_is_empty(session):
+    return session.run("MATCH (n) RETURN n LIMIT 1").single() is None
+
+def write_chunks(session, query, rows, chunk_size):
+    nodes = relationships = 0
+    for i in range(0, len(rows), chunk_size):
+        created = session.execute_write(run_counted, query, batch=rows[i:i + chunk_size])
+        nodes += created[0]
+        relationships += created[1]
+    return nodes, relationships
+
+# one worker: its own postgres cursor and neo4j session creating the orders up to max_order_id
+# of the users in (low, high] and their PLACED edges, a user has a hundred orders in the stock
+# data, so partitions split users rather than orders and no two workers ever lock the same User
+def import_partition(driver, low, high, max_order_id, batch_size):
+    pg_conn = get_pg_connection()
+    nodes = relationships = 0
+    try:
+        with driver.session() as session:
+            for batch in iter_order_batches(pg_conn, 0, batch_size, until=max_order_id, users=(low, high)):
+                created = session.execute_write(run_counted, create_orders_bulk_query, batch=batch)
+                nodes += created[0]
+                relationships += created[1]
+    finally:
+        pg_conn.close()
+    return nodes, relationships
+
+# CONTAINS edges for every order up to max_order_id, in one pass from a single writer
+def import_contains(driver, pg_conn, max_order_id, batch_size):
+    relationships = 0
+    with driver.session() as session:
+        for batch in iter_order_batches(pg_conn, 0, batch_size, until=max_order_id):
+            edges = sorted((pid, order["oid"]) for order in batch for pid in set(order["pids"]))
+            created = session.execute_write(run_counted, create_contains_bulk_query,
+                                            batch=[{"pid": pid, "oid": oid} for pid, oid in edges])
+            relationships += created[1]
+    pg_conn.rollback()
+    return relationships
+
+# initial load into an empty graph: constraints first, then products and users created once,
+# then orders in parallel over disjoint user_id ranges, their CONTAINS edges from one writer,
+# and finally the sync high-water mark
+def bulk_import(driver, pg_conn, products_col, workers=BULK_WORKERS, batch_size=ORDER_BATCH_SIZE):
+    with driver.session() as session:
+        if not graph_is_empty(session):
+            raise SystemExit("error: the bulk import needs an empty graph, use --rebuild or the incremental sync")
+
+        started = time.perf_counter()
+        products = fetch_products(products_col)
+        nodes, relationships = write_chunks(session, create_products_bulk_query, products, 5000)
+
+        pg_cur = pg_conn.cursor()
+        pg_cur.execute("SELECT COALESCE(MAX(order_id), 0) FROM Orders;")
+        max_order_id = pg_cur.fetchone()[0]
+        # only users with at least one item, like the incremental sync which walks the join
+        pg_cur.execute("""
+            SELECT DISTINCT o.user_id FROM Orders o
+            WHERE o.order_id <= %s AND EXISTS (SELECT 1 FROM Order_Items i WHERE i.order_id = o.order_id);
+        """, (max_order_id,))
+        users = [row[0] for row in pg_cur.fetchall()]
+        pg_conn.rollback()
+        created = write_chunks(session, create_users_bulk_query, users, 10000)
+        nodes += created[0]
+        relationships += created[1]
+        print(f"created {len(products)} products and {len(users)} users")
+
+    # (low, high] user_id ranges holding about the same number of users each
+    users.sort()
+    step = -(-len(users) // workers) if users else 0
+    ranges = [(users[w * step - 1] if w else users[0] - 1, users[min((w + 1) * step, len(users)) - 1])
+              for w in range(workers) if w * step < len(users)]
+    print(f"importing orders up to {max_order_id} with {len(ranges)} workers")
+    phase = time.perf_counter()
+    orders = placed = 0
+    with ThreadPoolExecutor(max_workers=max(len(ranges), 1)) as pool:
+        for created in pool.map(lambda r: import_partition(driver, r[0], r[1], max_order_id, batch_size), ranges):
+            orders += created[0]
+            placed += created[1]
+    report_graph_rate("bulk orders", orders, placed, time.perf_counter() - phase)
+
+    phase = time.perf_counter()
+    contains = import_contains(driver, pg_conn, max_order_id, batch_size)
+    report_graph_rate("bulk contains", 0, contains, time.perf_counter() - phase)
+
+    report_graph_rate("bulk import", nodes + orders, relationships + placed + contains,
+                      time.perf_counter() - started)
+
+    # the projection is built once at the end rather than merged by competing writers
+    with driver.session() as session:
+        build_bought_with(session)
+        session.run(write_sync_state_query, name=SYNC_STATE, last_order_id=max_order_id)
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+NEO4J_ADMIN_IMPORT = (
+    "neo4j-admin database import full --nodes=Product=products.csv --nodes=User=users.csv "
+    "--nodes=Order=orders.csv --nodes=SyncState=sync_state.csv "
+    "--relationships=PLACED=placed.csv --relationships=CONTAINS=contains.csv "
+    "--relationships=BOUGHT_WITH=bought_with.csv neo4j"
+)
+
+# files for the offline importer, the fastest path when the database can be stopped
+# integer ids get a typed property column next to the import-only :ID column, and the
+# SyncState node carries the high-water mark so the incremental sync resumes after the import
+def export_csv(pg_conn, products_col, directory, batch_size=ORDER_BATCH_SIZE):
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    products = fetch_products(products_col)
+    write_csv(os.path.join(directory, "products.csv"), ["product_id:ID(Product)", "name", "category", "subcategory"],
+              ([p["id"], p["name"], p["category"], p["subcategory"]] for p in products))
+
+    users = set()
+    known_products = {p["id"] for p in products}
+    orders = relationships = last_order_id = 0
+    pairs = Counter()
+    with open(os.path.join(directory, "orders.csv"), "w", newline="") as orders_f, \
+            open(os.path.join(directory, "placed.csv"), "w", newline="") as placed_f, \
+            open(os.path.join(directory, "contains.csv"), "w", newline="") as contains_f:
+        orders_csv, placed_csv, contains_csv = csv.writer(orders_f), csv.writer(placed_f), csv.writer(contains_f)
+        orders_csv.writerow([":ID(Order)", "order_id:long"])
+        placed_csv.writerow([":START_ID(User)", ":END_ID(Order)"])
+        contains_csv.writerow([":START_ID(Order)", ":END_ID(Product)"])
+        for batch in iter_order_batches(pg_conn, 0, batch_size):
+            for order in batch:
+                users.add(order["uid"])
+                orders_csv.writerow([order["oid"], order["oid"]])
+                placed_csv.writerow([order["uid"], order["oid"]])
+                # the online loaders drop items whose product is not in the graph, so does this
+                pids = sorted(pid for pid in set(order["pids"]) if pid in known_products)
+                for pid in pids:
+                    contains_csv.writerow([order["oid"], pid])
+                relationships += len(pids)
+                pairs.update(combinations(pids, 2))
+                orders += 1
+                relationships += 1
+                last_order_id = order["oid"]
+    pg_conn.rollback()
+    write_csv(os.path.join(directory, "users.csv"), [":ID(User)", "user_id:long"],
+              ([u, u] for u in sorted(users)))
+    write_csv(os.path.join(directory, "bought_with.csv"), [":START_ID(Product)", ":END_ID(Product)", "count:long"],
+              ([a, b, n] for (a, b), n in pairs.items()))
+    relationships += len(pairs)
+    write_csv(os.path.join(directory, "sync_state.csv"), ["name:ID(SyncState)", "last_order_id:long"],
+              [[SYNC_STATE, last_order_id]])
+    report_graph_rate(f"csv export to {directory}", len(products) + len(users) + orders, relationships,
+                      time.perf_counter() - started)
+    print(f"load it from {directory} with the database stopped: {NEO4J_ADMIN_IMPORT}")
+
+def initialize_graph(batch_size=ORDER_BATCH_SIZE, rebuild=False, bulk=False, workers=BULK_WORKERS, csv_dir=None,
+                     rebuild_bought_with=False):
     print("connecting to databases")
     try:
         # connect to postgres
         pg_conn = psycopg2.connect(host=PG_HOST, database=PG_DB, user=PG_USER, password=PG_PASS)
-        pg_cur = pg_conn.cursor()
 
         # connect to mongo
         mongo_client = pymongo.MongoClient(MONGO_URI)
@@ -31,98 +448,60 @@ def initialize_graph():
         
         # connect to neo4j
         driver = GraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
+
+        # connect to redis
+        r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
     except Exception as e:
         print(f"connection error: {e}")
         return
 
-    # load products (nodes)
-    print("fetching products from mongo")
-    mongo_products = list(products_col.find({}, {"_id": 1, "name": 1, "category": 1}))
-    
-    print(f"loading {len(mongo_products)} products into neo4j")
-    # query to create product nodes
-    create_products_query = """
-    UNWIND $batch AS row
-    MERGE (p:Product {product_id: row.id})
-    SET p.name = row.name, p.category = row.category
-    """
-    product_batch = [
-        {"id": str(p["_id"]), "name": p.get("name", "Unknown"), "category": p.get("category", "General")} 
-        for p in mongo_products
-    ]
-    
-    with driver.session() as session:
-        # clear old data
-        session.run("MATCH (n) DETACH DELETE n")
-        # create constraints for speed
-        try:
-            session.run("CREATE CONSTRAINT FOR (p:Product) REQUIRE p.product_id IS UNIQUE")
-            session.run("CREATE CONSTRAINT FOR (u:User) REQUIRE u.user_id IS UNIQUE")
-        except:
-            pass 
-
-        # batch insert products
-        chunk_size = 5000
-        for i in range(0, len(product_batch), chunk_size):
-            chunk = product_batch[i:i + chunk_size]
-            session.run(create_products_query, batch=chunk)
-            print(f"   indexed {i + len(chunk)} products")
-
-    # load orders (relationships)
-    print("fetching orders from postgres")
-    
-    # getting user id, order id, and the product id from the order_items table
-    sql_query = """
-        SELECT o.user_id, o.order_id, i.mongo_product_id
-        FROM Orders o JOIN Order_Items i ON o.order_id = i.order_id
-        LIMIT 100000; 
-    """
-    pg_cur.execute(sql_query)
-    rows = pg_cur.fetchall()
-    print(f"syncing order-item relationships to neo4j")
-    
-    # group by order id to minimize db calls
-    orders_map = {}
-    for user_id, order_id, prod_id in rows:
-        if order_id not in orders_map:
-            orders_map[order_id] = {"user": user_id, "products": []}
-        orders_map[order_id]["products"].append(prod_id)
-    # convert to list for batching
-    order_batch = []
-    for oid, data in orders_map.items():
-        order_batch.append({
-            "oid": oid,
-            "uid": data["user"],
-            "pids": data["products"]
-        })
-
-    # query to draw the graph
-    # (User)-[:PLACED]->(Order)-[:CONTAINS]->(Product)
-    create_graph_query = """
-    UNWIND $batch AS row
-    MERGE (u:User {user_id: row.uid})
-    MERGE (o:Order {order_id: row.oid})
-    MERGE (u)-[:PLACED]->(o)
-    WITH o, row
-    UNWIND row.pids AS pid
-    MATCH (p:Product {product_id: pid})
-    MERGE (o)-[:CONTAINS]->(p)
-    """
-    with driver.session() as session:
-        chunk_size = 1000
-        total = 0
-        for i in range(0, len(order_batch), chunk_size):
-            chunk = order_batch[i:i + chunk_size]
-            session.run(create_graph_query, batch=chunk)
-            total += len(chunk)
-            if total % 5000 == 0:
-                print(f"synced {total} orders")
-
-    print("graph populated!")
-    driver.close()
-    pg_cur.close()
-    pg_conn.close()
-    mongo_client.close()
+    try:
+        if csv_dir:
+            export_csv(pg_conn, products_col, csv_dir, batch_size)
+            return
+
+        # anything recomputed wholesale leaves every cached recommendation suspect
+        clear_cache = rebuild or bulk
+
+        with driver.session() as session:
+            if rebuild:
+                # clear old data, in batches so the transaction state stays small
+                print("clearing the graph")
+                session.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS")
+            create_constraints(session)
+            if not bulk:
+                load_products(session, products_col)
+                # graphs synced before the projection existed get it computed once, later syncs keep it current
+                if rebuild_bought_with or (has_relationship(session, "CONTAINS")
+                                           and not has_relationship(session, "BOUGHT_WITH")):
+                    build_bought_with(session)
+                    clear_cache = True
+
+        if bulk:
+            bulk_import(driver, pg_conn, products_col, workers, batch_size)
+        cache = invalidate_cache(r) if clear_cache else r
+        if not bulk:
+            # load orders (relationships), only the ones the graph has not seen yet
+            sync_orders(driver, pg_conn, batch_size, cache)
+        print("graph populated!")
+    finally:
+        driver.close()
+        pg_conn.close()
+        mongo_client.close()
+        r.close()
 
 # running the script
-initialize_graph()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync products and orders into the neo4j graph.")
+    parser.add_argument("--batch-size", type=int, default=ORDER_BATCH_SIZE, help="orders per write transaction")
+    parser.add_argument("--rebuild", action="store_true", help="wipe the graph first and sync the full history")
+    parser.add_argument("--bulk", action="store_true",
+                        help="initial load into an empty graph with CREATE and parallel writers")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS, help="parallel writers for --bulk")
+    parser.add_argument("--export-csv", type=str, metavar="DIR",
+                        help="write neo4j-admin import CSVs to DIR instead of loading the graph")
+    parser.add_argument("--rebuild-bought-with", action="store_true",
+                        help="recompute the BOUGHT_WITH co-purchase projection from the orders in the graph")
+    args = parser.parse_args()
+    initialize_graph(args.batch_size, args.rebuild, args.bulk, args.workers, args.export_csv,
+                     args.rebuild_bought_with)
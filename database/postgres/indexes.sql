@@ -0,0 +1,28 @@
+/* indexes for the evaluation queries */
+/* applied after the bulk load in setup.sh, safe to re-run */
+
+/* orders by user, newest last (queries 8, 9, 10, 13) */
+/* order_id is included so per-user counts can be answered from the index alone */
+/* query 10 and the all-users purchase intervals read it in (user_id, created_at) order for LAG() */
+create index if not exists orders_user_id_created_at_idx
+    on orders (user_id, created_at) include (order_id);
+
+/* foreign keys used by joins and cascades */
+create index if not exists order_items_order_id_idx on order_items (order_id);
+create index if not exists order_items_sku_idx on order_items (sku);
+create index if not exists shipments_order_id_idx on shipments (order_id);
+create index if not exists payments_order_id_idx on payments (order_id);
+create index if not exists returns_order_id_idx on returns (order_id);
+create index if not exists returns_sku_idx on returns (sku);
+
+/* low stock warnings (query 3), only the handful of rows under the threshold */
+create index if not exists inventory_low_stock_idx
+    on inventory (stock_level) include (sku) where stock_level < 5;
+
+/* refresh planner statistics and the visibility map for index-only scans */
+vacuum analyze orders;
+vacuum analyze order_items;
+vacuum analyze shipments;
+vacuum analyze payments;
+vacuum analyze returns;
+vacuum analyze inventory;
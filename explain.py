@@ -0,0 +1,130 @@
+import argparse
+import json
+import sys
+
+from connections import pg_conn, get_mongo_db, close_connections
+from queries import QUERIES, PG_STATEMENTS, MONGO_STATEMENTS, query_args, get_user_id
+
+# a seq scan over a table this small (in 8kB pages) is as cheap as any index probe and the
+# planner rightly prefers it, e.g. shipments which the generators leave empty
+SMALL_TABLE_PAGES = 8
+
+# walk an EXPLAIN (VERBOSE, FORMAT JSON) plan tree and collect every sequential scan
+# as (schema, relation), VERBOSE is what adds the schema
+def find_seq_scans(plan):
+    scans = []
+    if plan.get("Node Type") == "Seq Scan":
+        scans.append((plan.get("Schema", "public"), plan.get("Relation Name", "?")))
+    for child in plan.get("Plans", []):
+        scans.extend(find_seq_scans(child))
+    return scans
+
+# live on-disk size of each (schema, relation) in pages, relpages would still read 0 for a
+# table loaded with COPY and not analyzed since
+def relation_pages(cur, relations):
+    relations = list(relations)
+    cur.execute("""
+        SELECT s.nspname, s.relname, pg_relation_size(c.oid) / current_setting('block_size')::int
+        FROM unnest(%s::text[], %s::text[]) AS s(nspname, relname)
+        JOIN pg_class c ON c.oid = to_regclass(format('%%I.%%I', s.nspname, s.relname));
+    """, ([schema for schema, _ in relations], [name for _, name in relations]))
+    return {(schema, name): pages for schema, name, pages in cur.fetchall()}
+
+# explain every postgres query and flag the ones that fell back to a seq scan on a real table
+# returns a list of (query id, ok, detail)
+def check_postgres_plans(user_id, limit=50):
+    checks = []
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        for _, func, _, params in QUERIES:
+            if func not in PG_STATEMENTS:
+                continue
+            sql, sql_params = PG_STATEMENTS[func](*query_args(params, user_id, limit))
+            cur.execute("EXPLAIN (VERBOSE, FORMAT JSON) " + sql, sql_params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = set(find_seq_scans(plan[0]["Plan"]))
+            pages = relation_pages(cur, scans) if scans else {}
+            large = sorted(rel for rel in scans if pages.get(rel, SMALL_TABLE_PAGES + 1) > SMALL_TABLE_PAGES)
+            small = sorted(scans - set(large))
+            if large:
+                checks.append((func.__name__, False, f"seq scan on {', '.join(name for _, name in large)}"))
+            elif small:
+                checks.append((func.__name__, True,
+                               f"index access, seq scan only on small {', '.join(name for _, name in small)}"))
+            else:
+                checks.append((func.__name__, True, "index access only"))
+    return checks
+
+# collect every stage name in the winning plan of a mongo explain document
+# rejected plans are skipped, they never run
+def find_mongo_stages(node):
+    stages = []
+    if isinstance(node, dict):
+        if isinstance(node.get("stage"), str):
+            stages.append(node["stage"])
+        for key, value in node.items():
+            if key != "rejectedPlans":
+                stages.extend(find_mongo_stages(value))
+    elif isinstance(node, list):
+        for item in node:
+            stages.extend(find_mongo_stages(item))
+    return stages
+
+# explain() every mongo query and require an index scan, ideally a covered one
+def check_mongo_plans(user_id, limit=50):
+    checks = []
+    db = get_mongo_db()
+    for _, func, _, params in QUERIES:
+        if func not in MONGO_STATEMENTS:
+            continue
+        specs = MONGO_STATEMENTS[func](*query_args(params, user_id, limit))
+        if isinstance(specs, dict):
+            specs = [specs]
+        stages = []
+        for spec in specs:
+            command = dict(spec)
+            if "aggregate" in command:
+                command["cursor"] = {}
+            stages.extend(find_mongo_stages(db.command("explain", command, verbosity="queryPlanner")))
+        index_stages = {"IXSCAN", "DISTINCT_SCAN", "COUNT_SCAN", "IDHACK"}
+        if "COLLSCAN" in stages or not index_stages.intersection(stages):
+            checks.append((func.__name__, False, "collection scan"))
+        elif "FETCH" in stages:
+            checks.append((func.__name__, True, "index scan"))
+        else:
+            checks.append((func.__name__, True, "covered by index"))
+    return checks
+
+def run_plan_checks(user_id, limit=50):
+    return check_postgres_plans(user_id, limit) + check_mongo_plans(user_id, limit)
+
+def print_plan_checks(checks):
+    print("\n" + "=" * 70)
+    print(f"{'query':<12} | {'plan':<6} | detail")
+    print("=" * 70)
+    for qid, ok, detail in checks:
+        print(f"{qid:<12} | {'ok' if ok else 'FAIL':<6} | {detail}")
+    print("=" * 70)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the evaluation queries use indexes.")
+    parser.add_argument("--limit", type=int, default=50, help="result limit passed to the queries (0 for none)")
+    parser.add_argument("--user-id", type=int, help="user id to plan the per-user queries with")
+    args = parser.parse_args()
+
+    try:
+        user_id = args.user_id if args.user_id is not None else get_user_id()
+        checks = run_plan_checks(user_id, args.limit or None)
+    finally:
+        close_connections()
+
+    print_plan_checks(checks)
+    if not all(ok for _, ok, _ in checks):
+        print("some queries are not using an index")
+        sys.exit(1)
+    print("all checked queries use indexes")
+
+if __name__ == "__main__":
+    main()
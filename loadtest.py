@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from connections import pg_conn, close_connections
+from queries import QUERIES, query_args
+from stats import percentile
+
+# load test configuration
+DEFAULT_USERS = 20
+DEFAULT_DURATION = 60
+DEFAULT_WINDOW = 5
+
+# stand-in latencies (seconds) per query, taken from the single-pass numbers in output.txt
+STANDIN_LATENCY = {
+    "query_1": 0.0215, "query_2": 0.1411, "query_3": 0.0072, "query_4": 0.0268,
+    "query_5": 0.2132, "query_6": 0.1113, "query_7": 0.0623, "query_8": 0.0129,
+    "query_9": 0.0125, "query_10": 0.3418, "query_11": 0.2690, "query_12": 0.1342,
+    "query_13": 0.0185,
+}
+# how many requests each stand-in store serves at once, extra callers queue
+STANDIN_CAPACITY = {"postgres": 20, "mongo": 50, "redis": 50, "neo4j": 50}
+STANDIN_SIGMA = 0.35
+
+# in-process replacement for one store: bounded concurrency and lognormal service time
+# used to exercise the load generator without the docker-compose stack
+class StandInStore:
+    def __init__(self, backend, error_rate=0.0):
+        self.backend = backend
+        self.error_rate = error_rate
+        self._slots = threading.BoundedSemaphore(STANDIN_CAPACITY[backend])
+
+    def query(self, qid):
+        median = STANDIN_LATENCY[qid]
+
+        def run(*_):
+            with self._slots:
+                time.sleep(random.lognormvariate(math.log(median), STANDIN_SIGMA))
+                if self.error_rate and random.random() < self.error_rate:
+                    raise RuntimeError(f"stand-in {self.backend} error")
+        run.__name__ = qid
+        return run
+
+# hands out evenly spaced start slots so all users together stay at the target qps
+# a late caller starts immediately instead of bursting to catch up
+class Pacer:
+    def __init__(self, qps):
+        self.interval = 1.0 / qps if qps else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+# parse "query_2=5,query_8=1" into registry entries with weights
+def build_mix(spec, standin_error_rate=None):
+    weights = {}
+    if spec:
+        for part in spec.split(","):
+            qid, _, weight = part.partition("=")
+            weights[qid.strip()] = float(weight or 1)
+    stores = {}
+    entries = []
+    for name, func, backend, params in QUERIES:
+        qid = func.__name__
+        if weights and qid not in weights:
+            continue
+        if standin_error_rate is not None:
+            store = stores.setdefault(backend, StandInStore(backend, standin_error_rate))
+            func = store.query(qid)
+        entries.append(((name, qid, func, backend, params), weights.get(qid, 1.0)))
+    unknown = set(weights) - {entry[1] for entry, _ in entries}
+    if unknown:
+        raise ValueError(f"unknown queries in mix: {', '.join(sorted(unknown))}")
+    return entries
+
+# every user id in postgres, drawn from at random like get_user_id does
+def load_user_ids():
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT user_id FROM Users;")
+        return [row[0] for row in cur.fetchall()]
+
+def simulated_user(seed, entries, user_ids, limit, pacer, deadline, think_time, samples, run_start):
+    rng = random.Random(seed)
+    mix = [entry for entry, _ in entries]
+    weights = [weight for _, weight in entries]
+    while True:
+        pacer.wait()
+        if time.perf_counter() >= deadline:
+            return
+        _, qid, func, backend, params = rng.choices(mix, weights=weights, k=1)[0]
+        args = query_args(params, rng.choice(user_ids), limit)
+        start = time.perf_counter_ns()
+        error = None
+        try:
+            func(*args)
+        except Exception as e:
+            error = type(e).__name__
+        latency = time.perf_counter_ns() - start
+        samples.append((start / 1e9 - run_start, qid, backend, latency, error))
+        if think_time:
+            time.sleep(rng.expovariate(1.0 / think_time))
+
+def run_load(entries, user_ids, users, qps, duration, limit, think_time, seed):
+    samples = []
+    pacer = Pacer(qps)
+    run_start = time.perf_counter()
+    deadline = run_start + duration
+    threads = [
+        threading.Thread(target=simulated_user, daemon=True,
+                         args=(seed + i, entries, user_ids, limit, pacer, deadline, think_time, samples, run_start))
+        for i in range(users)
+    ]
+    # query functions print their results, none of that belongs in the report
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    return samples, time.perf_counter() - run_start
+
+def latency_stats(latencies_ns):
+    values = sorted(v / 1e6 for v in latencies_ns)
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+def summarize_load(samples, elapsed, window):
+    windows = defaultdict(list)
+    backends = defaultdict(list)
+    for sample in samples:
+        windows[int(sample[0] // window)].append(sample)
+        backends[sample[2]].append(sample)
+
+    def group_stats(group, span):
+        errors = sum(1 for s in group if s[4])
+        stats = {"requests": len(group), "errors": errors,
+                 "error_rate": round(errors / len(group), 4) if group else 0.0,
+                 "throughput_qps": round(len(group) / span, 2) if span else 0.0}
+        stats.update(latency_stats([s[3] for s in group if not s[4]]))
+        return stats
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "overall": group_stats(samples, elapsed),
+        "windows": [dict(start_s=i * window, **group_stats(windows[i], window)) for i in sorted(windows)],
+        "backends": {backend: group_stats(group, elapsed) for backend, group in sorted(backends.items())},
+    }
+
+def print_load_report(summary):
+    def row(label, stats):
+        print(f"{label:<12} | {stats['requests']:>8} | {stats['throughput_qps']:>8.1f} | {stats['p50_ms']:>9.2f} | "
+              f"{stats['p95_ms']:>9.2f} | {stats['p99_ms']:>9.2f} | {stats['error_rate'] * 100:>6.2f}%")
+
+    def header(label):
+        print(f"{label:<12} | {'requests':>8} | {'qps':>8} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | "
+              f"{'p99 (ms)':>9} | {'errors':>7}")
+
+    print("\nlatency over time")
+    header("window")
+    for stats in summary["windows"]:
+        row(f"{stats['start_s']:g}s", stats)
+    print("\nper backend")
+    header("backend")
+    for backend, stats in summary["backends"].items():
+        row(backend, stats)
+    print("\noverall")
+    header("")
+    row("total", summary["overall"])
+    print(f"\nran for {summary['elapsed_s']:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed-loop load test over the evaluation queries.")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help="simulated concurrent users")
+    parser.add_argument("--qps", type=float, default=0, help="target total queries/sec (0 = as fast as users allow)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds to run")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW, help="seconds per reporting window")
+    parser.add_argument("--mix", type=str, help="weighted query mix, e.g. query_2=5,query_8=3 (default: all equal)")
+    parser.add_argument("--limit", type=int, default=50, help="result limit passed to the queries (0 for none)")
+    parser.add_argument("--think-time", type=float, default=0, help="mean pause between a user's requests (s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the per-user query and user_id choice")
+    parser.add_argument("--standin", action="store_true", help="use in-process stand-ins instead of the databases")
+    parser.add_argument("--standin-error-rate", type=float, default=0.0, help="injected failure rate for stand-ins")
+    parser.add_argument("--output", type=str, help="write the summary to this JSON file")
+    args = parser.parse_args()
+
+    entries = build_mix(args.mix, args.standin_error_rate if args.standin else None)
+    print(f"load testing {len(entries)} queries with {args.users} users for {args.duration}s"
+          f"{f' at {args.qps} qps' if args.qps else ''}{' (stand-ins)' if args.standin else ''}")
+    try:
+        user_ids = list(range(1, 1001)) if args.standin else load_user_ids()
+        samples, elapsed = run_load(entries, user_ids, args.users, args.qps, args.duration,
+                                    args.limit or None, args.think_time, args.seed)
+    finally:
+        close_connections()
+
+    summary = summarize_load(samples, elapsed, args.window)
+    print_load_report(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"summary saved to '{args.output}'")
+
+if __name__ == "__main__":
+    main()
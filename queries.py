@@ -1,119 +1,123 @@
-import psycopg2
-import pymongo
-from neo4j import GraphDatabase
 from datetime import datetime, timedelta
 import time
 import argparse
+import os
 import sys
 import contextlib
+import csv
+import io
 import json
-import redis
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from connections import pg_conn, get_mongo_db, get_neo4j_driver, get_redis_client, close_connections
+from carts import SUMMARY_FIELDS, fetch_carts, cart_item_count, cart_total, cart_stats
 
-# postgres configuration
-PG_HOST = "localhost"
-PG_DB = "ecommerce_db"
-PG_USER = "admin"
-PG_PASS = "password"
-
-# mongo configuration
-MONGO_URI = "mongodb://localhost:27017/"
-MONGO_DB_NAME = "ecommerce_db"
-
-# neo4j configuration
-NEO4J_URI = "bolt://localhost:7687"
-NEO4J_AUTH = ("neo4j", "password")
-
-# redis configuration
-REDIS_HOST = "localhost"
-REDIS_PORT = 6379
-
-# postgres setup
-def get_pg_conn():
-    return psycopg2.connect(host=PG_HOST, database=PG_DB, 
-                            user=PG_USER, password=PG_PASS)
-
-# mongo setup
-def get_mongo_db():
-    client = pymongo.MongoClient(MONGO_URI)
-    return client[MONGO_DB_NAME]
-
-# neo4j setup
-def get_neo4j_driver():
-    return GraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
-
-# redis setup
-def get_redis_client():
-    return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "database", "mongo"))
+import rollups
 
 # fetches a random user id to assign to sarah
 def get_user_id():
-    conn = get_pg_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT user_id FROM Users ORDER BY RANDOM() LIMIT 1;")
-    user_id = cur.fetchone()[0]
-    conn.close()
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT user_id FROM Users ORDER BY RANDOM() LIMIT 1;")
+        user_id = cur.fetchone()[0]
     return user_id
 
+# user_events is either a plain collection or a time-series one (database/mongo/initialize_mongo.py
+# --layout), event queries name their fields through event_field so they run against either layout
+# the mapping and the detection are rollups.py's, the layout is looked up once per process
+_event_layout = None
+
+def event_layout():
+    global _event_layout
+    if _event_layout is None:
+        _event_layout = rollups.event_layout(get_mongo_db())
+    return _event_layout
+
+def event_field(name):
+    return rollups.EVENT_FIELDS[event_layout()][name]
+
 # queries
+# mongo queries build their command in query_N_spec helpers (same shape as the
+# server command) so explain.py can check the plan of exactly what they run
+def query_1_spec(limit=50):
+    return {"aggregate": "products", "pipeline": [
+        {"$match": {"category": "Fashion"}},
+        {"$project": {"name": 1, "attributes": 1, "variants": 1}}
+    ]}
+
 def query_1(limit=50):
     print("\nquery 1: retrieve all 'fashion' products with attributes")
     db = get_mongo_db()
-    pipeline = [
-        {"$match": {"category": "Fashion"}},
-        {"$project": {"name": 1, "attributes": 1, "variants": 1}}
-    ]
+    spec = query_1_spec(limit)
     
-    results = list(db.products.aggregate(pipeline))
+    results = list(db[spec["aggregate"]].aggregate(spec["pipeline"]))
     display_results = results[:limit] if limit else results
     for p in display_results:
         print(f"product: {p.get('name')}, attributes: {p.get('attributes')}")
     print(f"(total {len(results)} items found)")
 
+def query_2_spec(user_id, limit=50):
+    six_months_ago = datetime.utcnow() - timedelta(days=180)
+    spec = {
+        "find": "user_events",
+        "filter": {
+            event_field("user_id"): user_id, 
+            event_field("event_type"): "view_product",
+            "timestamp": {"$gte": six_months_ago}
+        },
+        "projection": {"details.product_id": 1, "timestamp": 1},
+        "sort": {"timestamp": -1}
+    }
+    if limit:
+        spec["limit"] = limit
+    return spec
+
 def query_2(user_id, limit=50):
     print(f"\nquery 2: last {limit if limit else 'all'} products viewed by sarah")
     db = get_mongo_db()
-    six_months_ago = (datetime.utcnow() - timedelta(days=180)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    spec = query_2_spec(user_id, limit)
     
-    cursor = db.user_events.find(
-        {
-            "user_id": user_id, 
-            "event_type": "view_product",
-            "timestamp": {"$gte": six_months_ago}
-        },
-        {"details.product_id": 1, "timestamp": 1}
-    ).sort("timestamp", -1)
+    cursor = db[spec["find"]].find(spec["filter"], spec["projection"]).sort(list(spec["sort"].items()))
     
     if limit:
-        cursor = cursor.limit(limit)
+        cursor = cursor.limit(spec["limit"])
         
     results = list(cursor)
     for r in results:
-        print(f"viewed: {r['details'].get('product_id')} at {r['timestamp']}")
+        print(f"viewed: {r['details'].get('product_id')} at {r['timestamp']:%Y-%m-%dT%H:%M:%SZ}")
 
-def query_3(limit=50):
-    print("\nquery 3: check current stock level (low stock < 5)")
-    conn = get_pg_conn()
-    cur = conn.cursor()
+# postgres statements live in query_N_sql helpers so the plan checks
+# in explain.py can run EXPLAIN on exactly what the query executes
+def query_3_sql(limit=50):
     limit_clause = f"LIMIT {limit}" if limit else ""
-    cur.execute(f"""
+    return f"""
         SELECT sku, stock_level FROM Inventory 
         WHERE stock_level < 5 {limit_clause};
-    """)
-    for row in cur.fetchall():
-        print(f"low stock warning: sku {row[0]} has only {row[1]} left.")
-    conn.close()
+    """, ()
 
-def query_4(limit=50):
-    print("\nquery 4: fashion products (blue or large)")
-    db = get_mongo_db()
-    query = {
+def query_3(limit=50):
+    print("\nquery 3: check current stock level (low stock < 5)")
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(*query_3_sql(limit))
+        for row in cur.fetchall():
+            print(f"low stock warning: sku {row[0]} has only {row[1]} left.")
+
+def query_4_spec(limit=50):
+    return {"find": "products", "filter": {
         "category": "Fashion",
         "$or": [
             {"variants.color": "Blue"},
             {"variants.size": "L"},
             {"attributes.size": "L"}
         ]
-    }
+    }}
+
+def query_4(limit=50):
+    print("\nquery 4: fashion products (blue or large)")
+    db = get_mongo_db()
+    query = query_4_spec(limit)["filter"]
     results = list(db.products.find(query))
     display_results = results[:limit] if limit else results
     for p in display_results:
@@ -122,29 +126,31 @@ def query_4(limit=50):
     count = db.products.count_documents(query)
     print(f"found {count} products matching criteria.")
 
+# views per product are kept as counters in product_popularity, incremented during
+# ingest (database/mongo/rollups.py), so this reads the top-N instead of grouping every view
+def query_5_spec(limit=50):
+    spec = {"find": "product_popularity", "filter": {}, "sort": {"views": -1, "_id": 1}}
+    if limit:
+        spec["limit"] = limit
+    return spec
+
 def query_5(limit=50):
     print("\nquery 5: product page views (ordered by popularity)")
     db = get_mongo_db()
-    pipeline = [
-        {"$match": {"event_type": "view_product"}},
-        {"$group": {"_id": "$details.product_id", "views": {"$sum": 1}}},
-        {"$sort": {"views": -1}}
-    ]
-    if limit:
-        pipeline.append({"$limit": limit})
+    spec = query_5_spec(limit)
     
-    results = list(db.user_events.aggregate(pipeline))
-    for r in results:
+    cursor = db[spec["find"]].find(spec["filter"]).sort(list(spec["sort"].items()))
+    if limit:
+        cursor = cursor.limit(spec["limit"])
+    for r in cursor:
         print(f"product {r['_id']}: {r['views']} views")
 
-def query_6(user_id, limit=50):
-    print(f"\nquery 6: recent search terms for sarah (frequency & time of day)")
-    db = get_mongo_db()
+def query_6_spec(user_id, limit=50):
     pipeline = [
-        {"$match": {"user_id": user_id, "event_type": "search"}},
+        {"$match": {event_field("user_id"): user_id, event_field("event_type"): "search"}},
         {"$project": {
             "query": "$details.query",
-            "hour": {"$hour": {"$dateFromString": {"dateString": "$timestamp"}}}
+            "hour": {"$hour": "$timestamp"}
         }},
         {"$project": {
             "query": 1,
@@ -168,78 +174,138 @@ def query_6(user_id, limit=50):
     
     if limit:
         pipeline.append({"$limit": limit})
-    results = list(db.user_events.aggregate(pipeline))
+    return {"aggregate": "user_events", "pipeline": pipeline}
+
+def query_6(user_id, limit=50):
+    print(f"\nquery 6: recent search terms for sarah (frequency & time of day)")
+    db = get_mongo_db()
+    spec = query_6_spec(user_id, limit)
+    results = list(db[spec["aggregate"]].aggregate(spec["pipeline"]))
     for r in results:
         print(f"term: '{r['_id']['query']}', time: {r['_id']['tod']}, count: {r['count']}")
 
 def query_7(limit=50):
     print("\nquery 7: fetch all carts (from redis)")
     r = get_redis_client()
-    keys = list(r.scan_iter("cart:*"))
-    print(f"total active carts in redis: {len(keys)}")
+    total, carts, round_trips = fetch_carts(r, limit, fields=SUMMARY_FIELDS)
+    print(f"total active carts in redis: {total}")
     
-    display_keys = keys[:limit] if limit else keys
-    for key in display_keys:
-        cart = r.hgetall(key)
-        items = json.loads(cart.get("items", "[]"))
-        item_count = sum(item['quantity'] for item in items)
+    for key, cart in carts:
+        item_count = cart_item_count(cart)
         
-        print(f"cart ({key}): user {cart.get('user_id')} on {cart.get('device')} has {item_count} items. total: ${cart.get('total_amount')}")
+        print(f"cart ({key}): user {cart.get('user_id')} on {cart.get('device')} has {item_count} items. total: ${cart_total(cart)}")
 
-def query_8(user_id, limit=50):
-    print(f"\nquery 8: retrieve all orders for sarah")
-    conn = get_pg_conn()
-    cur = conn.cursor()
+    # dashboard aggregates come from the counters the cart writes maintain, not from the carts
+    stats = cart_stats(r, now=int(time.time()))
+    devices = ", ".join(f"{device} {count}" for device, count in stats["devices"].items())
+    print(f"active cart value: ${stats['value']:.2f} over {stats['carts']} carts, "
+          f"{stats['avg_items']} items per cart ({devices})")
+    print(f"({round_trips + stats['round_trips']} redis round trips)")
+
+def query_8_sql(user_id, limit=50):
     limit_clause = f"LIMIT {limit}" if limit else ""
-    query = f"""
+    return f"""
         SELECT o.order_id, o.status, o.total_amount, s.shipping_method
         FROM Orders o LEFT JOIN Shipments s ON o.order_id = s.order_id
         WHERE o.user_id = %s {limit_clause};
-    """
-    cur.execute(query, (user_id,))
-    rows = cur.fetchall()
-    for r in rows:
-        print(f"order {r[0]}: status={r[1]}, total=${r[2]}, ship={r[3]}")
-    conn.close()
+    """, (user_id,)
 
-def query_9(user_id):
-    print(f"\nquery 9: list items returned by sarah")
-    conn = get_pg_conn()
-    cur = conn.cursor()
-    query = """
+def query_8(user_id, limit=50):
+    print(f"\nquery 8: retrieve all orders for sarah")
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(*query_8_sql(user_id, limit))
+        rows = cur.fetchall()
+        for r in rows:
+            print(f"order {r[0]}: status={r[1]}, total=${r[2]}, ship={r[3]}")
+
+def query_9_sql(user_id):
+    return """
         SELECT r.return_id, r.sku, r.refund_amount, r.status FROM Returns r
         JOIN Orders o ON r.order_id = o.order_id WHERE o.user_id = %s;
-    """
-    cur.execute(query, (user_id,))
-    rows = cur.fetchall()
-    
-    if rows:
-        for r in rows:
-            print(f"return {r[0]}: sku {r[1]}, refund ${r[2]}, status {r[3]}")
-    else:
-        print("no returns found for this user.")
-    conn.close()
+    """, (user_id,)
+
+def query_9(user_id):
+    print(f"\nquery 9: list items returned by sarah")
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(*query_9_sql(user_id))
+        rows = cur.fetchall()
+
+        if rows:
+            for r in rows:
+                print(f"return {r[0]}: sku {r[1]}, refund ${r[2]}, status {r[3]}")
+        else:
+            print("no returns found for this user.")
+
+# gap to the previous order with LAG over the user's orders in created_at order, read straight
+# from orders (user_id, created_at) with no sort and no per-row subquery
+def query_10_sql(user_id):
+    return """
+        SELECT AVG(EXTRACT(DAY FROM (created_at - previous_at))) FROM (
+            SELECT created_at, LAG(created_at) OVER (PARTITION BY user_id ORDER BY created_at) AS previous_at
+            FROM Orders WHERE user_id = %s
+        ) gaps;
+    """, (user_id,)
 
 def query_10(user_id):
     print(f"\nquery 10: average days between purchases for sarah")
-    conn = get_pg_conn()
-    cur = conn.cursor()
-    query = """
-        SELECT AVG(EXTRACT(DAY FROM (o.created_at - (
-            SELECT MAX(sub.created_at) FROM Orders sub 
-            WHERE sub.user_id = o.user_id AND sub.created_at < o.created_at
-        )))) FROM Orders o WHERE o.user_id = %s;
-    """
-    cur.execute(query, (user_id,))
-    result = cur.fetchone()[0]
-    print(f"average days: {result if result else 'n/a (not enough orders)'}")
-    conn.close()
-
-def query_11():
-    print("\nquery 11: cart abandonment % (last 30 days)")
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(*query_10_sql(user_id))
+        result = cur.fetchone()[0]
+        print(f"average days: {result if result else 'n/a (not enough orders)'}")
+
+# the same gaps for every user in one pass over the index, for exports rather than the
+# evaluation run, gaps are NULL for a user's first order so users with one order get NULL stats
+PURCHASE_INTERVAL_FIELDS = ("user_id", "orders", "avg_days", "min_days", "max_days", "last_order_at")
+
+def purchase_intervals_sql():
+    return """
+        SELECT user_id, COUNT(*), AVG(EXTRACT(DAY FROM gap)), MIN(EXTRACT(DAY FROM gap)),
+               MAX(EXTRACT(DAY FROM gap)), MAX(created_at)
+        FROM (
+            SELECT user_id, created_at,
+                   created_at - LAG(created_at) OVER (PARTITION BY user_id ORDER BY created_at) AS gap
+            FROM Orders
+        ) gaps
+        GROUP BY user_id ORDER BY user_id;
+    """, ()
+
+def purchase_intervals():
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(*purchase_intervals_sql())
+        return [dict(zip(PURCHASE_INTERVAL_FIELDS, row)) for row in cur.fetchall()]
+
+def export_purchase_intervals(path):
+    rows = purchase_intervals()
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PURCHASE_INTERVAL_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "avg_days": None if row["avg_days"] is None else round(row["avg_days"], 2)})
+    print(f"purchase intervals for {len(rows)} users written to '{path}'")
+
+# abandonment is read from the daily rollup in cart_activity_daily (database/mongo/rollups.py):
+# distinct sessions per day that added to cart or purchased, summed over the window server side
+ABANDONMENT_WINDOW_DAYS = 30
+
+def query_11_spec(days=ABANDONMENT_WINDOW_DAYS, end=None):
+    end = end or datetime.utcnow()
+    start = end - timedelta(days=days - 1)
+    return {"aggregate": "cart_activity_daily", "pipeline": [
+        {"$match": {"_id": {"$gte": start.strftime("%Y-%m-%d"), "$lte": end.strftime("%Y-%m-%d")}}},
+        {"$group": {"_id": None, "carts": {"$sum": "$carts"}, "purchases": {"$sum": "$purchases"},
+                    "days": {"$sum": 1}}},
+    ]}
+
+def query_11(days=ABANDONMENT_WINDOW_DAYS, end=None):
+    print(f"\nquery 11: cart abandonment % (last {days} days)")
     db = get_mongo_db()
-    carts = len(db.user_events.distinct("session_id", {"event_type": "add_to_cart"}))
-    purchases = len(db.user_events.distinct("session_id", {"event_type": "purchase_completed"}))
+    spec = query_11_spec(days, end)
+    totals = next(db[spec["aggregate"]].aggregate(spec["pipeline"]), {"carts": 0, "purchases": 0})
+    carts, purchases = totals["carts"], totals["purchases"]
     if carts > 0:
         abandoned = ((carts - purchases) / carts) * 100
         print(f"carts created: {carts}, purchases: {purchases}")
@@ -247,21 +313,26 @@ def query_11():
     else:
         print("no cart activity found.")
 
-def query_12(limit=3):
-    print("\nquery 12: top 3 products purchased with 'headphones'")
-    driver = get_neo4j_driver()
+# co-purchase counts are read from the BOUGHT_WITH projection kept by initialize_neo4j.py,
+# one hop from the target products found through the subcategory index or the product_id constraint
+def query_12_cypher(limit=3, product_id=None, subcategory="Headphones"):
     limit_clause = f"LIMIT {limit}" if limit else ""
-    query = f"""
-        MATCH (target:Product) WHERE target.name CONTAINS 'Headphones'
-        MATCH (target)<-[:CONTAINS]-(o:Order)-[:CONTAINS]->(other:Product)
-        WHERE target <> other
-        RETURN other.name, count(*) as frequency
+    target = "{product_id: $product_id}" if product_id else "{subcategory: $subcategory}"
+    return f"""
+        MATCH (target:Product {target})-[r:BOUGHT_WITH]-(other:Product)
+        RETURN other.name, sum(r.count) AS frequency
         ORDER BY frequency DESC
         {limit_clause}
-    """
-    
+    """, {"product_id": product_id, "subcategory": subcategory}
+
+def query_12(limit=3, product_id=None):
+    print(f"\nquery 12: top 3 products purchased with {product_id}" if product_id
+          else "\nquery 12: top 3 products purchased with 'headphones'")
+    driver = get_neo4j_driver()
+    query, params = query_12_cypher(limit, product_id)
+
     with driver.session() as session:
-        results = session.run(query)
+        results = session.run(query, params)
         data = list(results)
         if data:
             for r in data:
@@ -269,50 +340,145 @@ def query_12(limit=3):
         else:
             print("no graph matches found (check if seed_graph.py ran successfully).")
 
-def query_13(limit=50):
-    print("\nquery 13: user lifetime stats (days since purchase, total count)")
-    conn = get_pg_conn()
-    cur = conn.cursor()
-    
+def query_13_sql(limit=50):
     limit_clause = f"LIMIT {limit}" if limit else ""
-    query = f"""
+    return f"""
         SELECT user_id, COUNT(order_id) as total_orders,
         EXTRACT(DAY FROM (NOW() - MAX(created_at))) as days_since_last
         FROM Orders GROUP BY user_id {limit_clause};
-    """
-    cur.execute(query)
-    for r in cur.fetchall():
-        print(f"user {r[0]}: {r[1]} orders, last purchased {r[2]} days ago")
-    conn.close()
+    """, ()
+
+def query_13(limit=50):
+    print("\nquery 13: user lifetime stats (days since purchase, total count)")
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(*query_13_sql(limit))
+        for r in cur.fetchall():
+            print(f"user {r[0]}: {r[1]} orders, last purchased {r[2]} days ago")
+
+# query registry: (display name, function, backend, parameters it takes)
+QUERIES = [
+    ("query 1: fashion products", query_1, "mongo", ("limit",)),
+    ("query 2: recent views", query_2, "mongo", ("user_id", "limit")),
+    ("query 3: low stock", query_3, "postgres", ("limit",)),
+    ("query 4: fashion blue/large", query_4, "mongo", ("limit",)),
+    ("query 5: product popularity", query_5, "mongo", ("limit",)),
+    ("query 6: search terms", query_6, "mongo", ("user_id", "limit")),
+    ("query 7: fetch carts (redis)", query_7, "redis", ("limit",)),
+    ("query 8: sarah orders", query_8, "postgres", ("user_id", "limit")),
+    ("query 9: returned items", query_9, "postgres", ("user_id",)),
+    ("query 10: avg days between purchases", query_10, "postgres", ("user_id",)),
+    ("query 11: cart abandonment", query_11, "mongo", ()),
+    ("query 12: frequently bought together", query_12, "neo4j", ("limit",)),
+    ("query 13: user lifetime stats", query_13, "postgres", ("limit",)),
+]
+
+# postgres queries and the builders for the statements they run
+PG_STATEMENTS = {
+    query_3: query_3_sql,
+    query_8: query_8_sql,
+    query_9: query_9_sql,
+    query_10: query_10_sql,
+    query_13: query_13_sql,
+}
+
+# mongo queries and the builders for the commands they run
+# a builder may return one command or a list of them
+MONGO_STATEMENTS = {
+    query_1: query_1_spec,
+    query_2: query_2_spec,
+    query_4: query_4_spec,
+    query_5: query_5_spec,
+    query_6: query_6_spec,
+    query_11: query_11_spec,
+}
+
+def query_args(params, user_id, limit):
+    values = {"user_id": user_id, "limit": limit}
+    return tuple(values[p] for p in params)
+
+# latency budgets in seconds, keyed by query function name
+# anything not listed here falls back to the default budget
+DEFAULT_BUDGET = 2.0
+LATENCY_BUDGETS = {}
+
+def load_budgets(path):
+    with open(path, "r") as f:
+        LATENCY_BUDGETS.update({k: float(v) for k, v in json.load(f).items()})
+
+def get_budget(func):
+    return LATENCY_BUDGETS.get(func.__name__, DEFAULT_BUDGET)
 
 # query timer
 def time_query(name, func, *args):
-    start = time.time()
+    start = time.perf_counter()
     try:
         func(*args)
-        duration = time.time() - start
-        status = "pass" if duration <= 2.0 else "fail"
+        duration = time.perf_counter() - start
+        status = "pass" if duration <= get_budget(func) else "fail"
         return name, duration, status
     except Exception as e:
         return name, 0.0, f"error: {e}"
 
+# stdout proxy that sends each thread's prints to its own buffer
+# lets concurrently running queries keep their output in one readable block
+class ThreadLocalStdout:
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._local = threading.local()
+
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        return self._local.buffer
+
+    def release(self):
+        self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer or self.fallback).write(text)
+
+    def flush(self):
+        buffer = getattr(self._local, "buffer", None)
+        (buffer or self.fallback).flush()
+
+def time_query_buffered(proxy, name, func, *args):
+    buffer = proxy.capture()
+    try:
+        result = time_query(name, func, *args)
+    finally:
+        proxy.release()
+    return result, buffer.getvalue()
+
+# runs every query on a thread pool, output is replayed in registry order
+def run_concurrently(jobs, workers=None):
+    proxy = ThreadLocalStdout(sys.stdout)
+    sys.stdout = proxy
+    try:
+        with ThreadPoolExecutor(max_workers=workers or len(jobs)) as pool:
+            futures = [pool.submit(time_query_buffered, proxy, name, func, *args)
+                       for name, func, args in jobs]
+            completed = [future.result() for future in futures]
+    finally:
+        sys.stdout = proxy.fallback
+
+    results = []
+    for result, output in completed:
+        sys.stdout.write(output)
+        results.append(result)
+    return results
+
 # evaluation
-def run_evaluation(limit=50):
+def run_evaluation(limit=50, concurrent=False, workers=None):
     user_id = get_user_id()
-    results = []
-    results.append(time_query("query 1: fashion products", query_1, limit))
-    results.append(time_query("query 2: recent views", query_2, user_id, limit))
-    results.append(time_query("query 3: low stock", query_3, limit))
-    results.append(time_query("query 4: fashion blue/large", query_4, limit))
-    results.append(time_query("query 5: product popularity", query_5, limit))
-    results.append(time_query("query 6: search terms", query_6, user_id, limit))
-    results.append(time_query("query 7: fetch carts (redis)", query_7, limit))
-    results.append(time_query("query 8: sarah orders", query_8, user_id, limit))
-    results.append(time_query("query 9: returned items", query_9, user_id))
-    results.append(time_query("query 10: avg days between purchases", query_10, user_id))
-    results.append(time_query("query 11: cart abandonment", query_11))
-    results.append(time_query("query 12: frequently bought together", query_12, limit))
-    results.append(time_query("query 13: user lifetime stats", query_13, limit))
+    jobs = [(name, func, query_args(params, user_id, limit)) for name, func, _, params in QUERIES]
+
+    wall_start = time.perf_counter()
+    if concurrent:
+        results = run_concurrently(jobs, workers)
+    else:
+        results = [time_query(name, func, *args) for name, func, args in jobs]
+    wall_time = time.perf_counter() - wall_start
     
     print("\n===============================================================")
     print(f"{'query':<40} | {'time (s)':<10} | {'status':<10}")
@@ -325,15 +491,32 @@ def run_evaluation(limit=50):
             all_pass = False
             
     print("===============================================================")
+    summed_time = sum(duration for _, duration, _ in results)
+    print(f"mode: {'concurrent' if concurrent else 'sequential'}")
+    print(f"wall-clock time: {wall_time:.4f}s, summed query time: {summed_time:.4f}s, "
+          f"speedup: {summed_time / wall_time if wall_time else 0:.2f}x")
     if all_pass:
-        print("\nall queries passed the 2-second performance limit")
+        print("\nall queries passed their performance budgets")
     else:
         print("\nsome queries failed performance or execution checks")
 
 def execute_queries():
     parser = argparse.ArgumentParser(description="Run queries.")
     parser.add_argument("--export", help="Export output to file", type=str)
+    parser.add_argument("--budgets", help="JSON file of per-query latency budgets (seconds)", type=str)
+    parser.add_argument("--concurrent", help="Run independent queries in parallel", action="store_true")
+    parser.add_argument("--workers", help="Thread count for --concurrent (default: one per query)", type=int)
+    parser.add_argument("--purchase-intervals", help="Write days-between-purchases stats for every user to this CSV",
+                        type=str)
     args = parser.parse_args()
+    if args.purchase_intervals:
+        try:
+            export_purchase_intervals(args.purchase_intervals)
+        finally:
+            close_connections()
+        return
+    if args.budgets:
+        load_budgets(args.budgets)
     limit = 50
     output_context = contextlib.nullcontext()
     if args.export:
@@ -346,10 +529,14 @@ def execute_queries():
         with output_context as f:
             if f:
                 sys.stdout = f
-            run_evaluation(limit)
+            run_evaluation(limit, args.concurrent, args.workers)
     except Exception as e:
         print(f"\nerror evaluating queries: {e}")
+    finally:
+        close_connections()
     print(f"total execution time: {time.time() - start_time:.2f} seconds")
 
 # executing the queries
-execute_queries()
+if __name__ == "__main__":
+    execute_queries()
+
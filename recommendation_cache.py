@@ -0,0 +1,35 @@
+# redis keys of the cached recommendations, shared by recommendations.py which fills them and
+# database/neo4j/initialize_neo4j.py which invalidates them, needs nothing but a redis client
+REC_PREFIX = "rec:"
+REC_PATTERN = REC_PREFIX + "*"
+REC_TTL = 600
+UNLINK_BATCH = 500
+
+def user_key(user_id):
+    return f"{REC_PREFIX}user:{user_id}"
+
+def product_key(product_id):
+    return f"{REC_PREFIX}product:{product_id}"
+
+# drop the cached results a batch of synced orders made stale: its products and every user
+# owning one of them, the caller looks the owners up in the graph
+# returns the number of keys removed
+def invalidate_recommendations(r, user_ids=(), product_ids=()):
+    keys = [user_key(u) for u in set(user_ids)] + [product_key(p) for p in set(product_ids)]
+    removed = 0
+    for i in range(0, len(keys), UNLINK_BATCH):
+        removed += r.unlink(*keys[i:i + UNLINK_BATCH])
+    return removed
+
+# after a rebuild every cached result is suspect, the cache is small and this is rare
+def clear_recommendations(r):
+    removed = 0
+    batch = []
+    for key in r.scan_iter(match=REC_PATTERN, count=1000):
+        batch.append(key)
+        if len(batch) == UNLINK_BATCH:
+            removed += r.unlink(*batch)
+            batch = []
+    if batch:
+        removed += r.unlink(*batch)
+    return removed
@@ -0,0 +1,160 @@
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from connections import pg_conn, get_neo4j_driver, get_redis_client, close_connections
+from recommendation_cache import REC_TTL, user_key, product_key, clear_recommendations
+from stats import percentile
+
+# collaborative filtering over the neo4j graph, (User)-[:PLACED]->(Order)-[:CONTAINS]->(Product)
+# plus the BOUGHT_WITH co-purchase projection maintained by initialize_neo4j.py
+# results are cached in redis under one key per user / product, the sync unlinks the keys of
+# the products its new orders touch and of every user owning one of them, whose co-purchase
+# scores those orders changed, and the TTL bounds staleness for anything missed
+# (keys and invalidation live in recommendation_cache.py)
+DEFAULT_K = 10
+# a cached list holds the top CACHE_DEPTH results, smaller k are sliced from it
+CACHE_DEPTH = 50
+
+# benchmark defaults
+DEFAULT_CONCURRENCY = 20
+DEFAULT_SAMPLE = 200
+DEFAULT_REQUESTS = 2000
+
+# item-based: products most often in the same order as the product
+similar_products_query = """
+MATCH (p:Product {product_id: $product_id})-[r:BOUGHT_WITH]-(other:Product)
+RETURN other.product_id AS product_id, other.name AS name, r.count AS score
+ORDER BY score DESC, product_id
+LIMIT $k
+"""
+
+# user-based through items: everything co-purchased with what the user bought, weighted by the
+# co-purchase counts and summed over the user's products, minus what the user already owns
+recommend_for_user_query = """
+MATCH (u:User {user_id: $user_id})-[:PLACED]->(:Order)-[:CONTAINS]->(owned:Product)
+WITH collect(DISTINCT owned) AS owned
+UNWIND owned AS p
+MATCH (p)-[r:BOUGHT_WITH]-(rec:Product)
+WHERE NOT rec IN owned
+RETURN rec.product_id AS product_id, rec.name AS name, sum(r.count) AS score
+ORDER BY score DESC, product_id
+LIMIT $k
+"""
+
+def run_recommendation(query, k, **params):
+    with get_neo4j_driver().session() as session:
+        return [record.data() for record in session.run(query, k=k, **params)]
+
+# read-through cache, returns (results, hit)
+# a k above CACHE_DEPTH is computed directly and not cached
+def cached_recommendation(key, k, query, **params):
+    if k > CACHE_DEPTH:
+        return run_recommendation(query, k, **params), False
+    r = get_redis_client()
+    cached = r.get(key)
+    if cached is not None:
+        return json.loads(cached)[:k], True
+    results = run_recommendation(query, CACHE_DEPTH, **params)
+    r.set(key, json.dumps(results), ex=REC_TTL)
+    return results[:k], False
+
+def recommend_for_user(user_id, k=DEFAULT_K):
+    return cached_recommendation(user_key(user_id), k, recommend_for_user_query, user_id=user_id)[0]
+
+def similar_products(product_id, k=DEFAULT_K):
+    return cached_recommendation(product_key(product_id), k, similar_products_query, product_id=product_id)[0]
+
+def load_sample(size):
+    with pg_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT user_id FROM Orders ORDER BY user_id;")
+        user_ids = [row[0] for row in cur.fetchall()]
+    with get_neo4j_driver().session() as session:
+        product_ids = [record["product_id"] for record in session.run(
+            "MATCH (p:Product)-[:BOUGHT_WITH]-() RETURN DISTINCT p.product_id AS product_id")]
+    return (random.sample(user_ids, min(size, len(user_ids))),
+            random.sample(product_ids, min(size, len(product_ids))))
+
+def timed(func, key, k):
+    started = time.perf_counter_ns()
+    _, hit = func(key, k)
+    return time.perf_counter_ns() - started, hit
+
+def run_phase(func, keys, k, concurrency):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda key: timed(func, key, k), keys))
+    elapsed = time.perf_counter() - started
+    values = sorted(ns / 1e6 for ns, _ in samples)
+    return {
+        "requests": len(samples),
+        "hit_rate": round(sum(hit for _, hit in samples) / len(samples), 3) if samples else 0.0,
+        "throughput": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        **{f"p{p}_ms": round(percentile(values, p), 3) for p in (50, 95, 99)},
+    }
+
+# cold: empty cache, every sampled entity requested once so each call misses and hits neo4j
+# warm: random requests over the same entities, all served from redis
+def benchmark_recommendations(sample, requests, k, concurrency):
+    user_ids, product_ids = load_sample(sample)
+    calls = {
+        "recommend_for_user": (lambda user_id, k: cached_recommendation(
+            user_key(user_id), k, recommend_for_user_query, user_id=user_id), user_ids),
+        "similar_products": (lambda product_id, k: cached_recommendation(
+            product_key(product_id), k, similar_products_query, product_id=product_id), product_ids),
+    }
+    report = {}
+    for name, (func, keys) in calls.items():
+        if not keys:
+            continue
+        clear_recommendations(get_redis_client())
+        report[f"{name} cold"] = run_phase(func, keys, k, concurrency)
+        report[f"{name} warm"] = run_phase(func, [random.choice(keys) for _ in range(requests)], k, concurrency)
+    return report
+
+def print_benchmark(report, concurrency):
+    print("\n" + "=" * 86)
+    print(f"{'call (' + str(concurrency) + ' threads)':<26} | {'requests':>8} | {'hits':>5} | "
+          f"{'req/s':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7}")
+    print("=" * 86)
+    for name, row in report.items():
+        print(f"{name:<26} | {row['requests']:>8} | {row['hit_rate']:>5.0%} | {row['throughput']:>8} | "
+              f"{row['p50_ms']:>7.2f} | {row['p95_ms']:>7.2f} | {row['p99_ms']:>7.2f}")
+    print("=" * 86)
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph recommendations with a redis result cache.")
+    parser.add_argument("--user-id", type=int, help="print recommendations for this user")
+    parser.add_argument("--product-id", type=str, help="print products similar to this product")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="results per call")
+    parser.add_argument("--benchmark", action="store_true", help="measure cold and warm cache latency")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="benchmark threads")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE, help="users and products in the benchmark")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="warm requests per call")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the benchmark sample")
+    parser.add_argument("--output", type=str, help="write the benchmark report to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        if args.user_id is not None:
+            for rec in recommend_for_user(args.user_id, args.k):
+                print(f"product: {rec['name']} ({rec['product_id']}), score: {rec['score']}")
+        if args.product_id:
+            for rec in similar_products(args.product_id, args.k):
+                print(f"product: {rec['name']} ({rec['product_id']}), bought together {rec['score']} times")
+        if args.benchmark:
+            random.seed(args.seed)
+            report = benchmark_recommendations(args.sample, args.requests, args.k, args.concurrency)
+            print_benchmark(report, args.concurrency)
+            if args.output:
+                with open(args.output, "w") as f:
+                    json.dump(report, f, indent=2)
+                print(f"report saved to '{args.output}'")
+    finally:
+        close_connections()
+
+if __name__ == "__main__":
+    main()
@@ -45,8 +45,10 @@ echo "-- loading postgres schema --"
 cat database/postgres/schema.sql | docker compose exec -T postgres psql -U admin -d ecommerce_db
 echo "-- generating users (sql insert) --"
 python3 data/users/generate_users.py
-echo "-- generating orders (sql insert) --"
-python3 data/orders/generate_orders.py
+echo "-- generating orders (bulk copy) --"
+python3 data/orders/generate_orders.py --bulk
+echo "-- creating postgres indexes --"
+cat database/postgres/indexes.sql | docker compose exec -T postgres psql -U admin -d ecommerce_db
 
 # initialize graph
 echo "-- initializing neo4j graph --"
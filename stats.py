@@ -0,0 +1,10 @@
+# shared by benchmark.py, loadtest.py and recommendations.py, kept free of database imports
+
+# linear interpolation between closest ranks, values must be sorted
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)